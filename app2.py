@@ -1,18 +1,40 @@
+import time
+T_START = time.perf_counter()  # วัดเวลาตั้งแต่เริ่มรัน script (รวม import รอบแรกของ process)
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
 from datetime import datetime, date, timedelta
+import atexit
+import functools
+import os
+import uuid
 import gspread
+from requests.adapters import HTTPAdapter
+import storage
+import scoring
+import reports
+import taskgraph
+import metrics
+import bulk
 
 # ---------------------------------------------------------
 # 1. การตั้งค่า (CONFIGURATION)
 # ---------------------------------------------------------
 st.set_page_config(page_title="ระบบติดตามงาน AII", layout="wide", initial_sidebar_state="auto")
+run = metrics.Run(T_START)
+run.mark('imports')
+# แผงวัดประสิทธิภาพ (ตัวเลขภายใน / metrics ของ process): เปิดได้จากฝั่ง server เท่านั้น
+# env TRACKER_ADMIN=1 หรือ tracker_admin = "1" ใน secrets ไม่ใช่จาก URL ที่ผู้ใช้คนไหนก็ใส่เองได้
+def _admin_enabled():
+    if os.environ.get("TRACKER_ADMIN") == "1": return True
+    try: return str(st.secrets.get("tracker_admin", "")) == "1"
+    except FileNotFoundError: return False  # ไม่มีไฟล์ secrets
+
+ADMIN = _admin_enabled()
 
 st.markdown("""
     <style>
         .block-container { padding-top: 1.5rem; padding-bottom: 3rem; }
-        button[data-baseweb="tab"] { border-radius: 5px; margin: 0 2px; }
         #MainMenu {visibility: hidden;}
         footer {visibility: hidden;}
     </style>
@@ -23,236 +45,391 @@ st.title("🌌 Project Tracker")
 # ==========================================
 # 2. เชื่อมต่อ GOOGLE SHEETS
 # ==========================================
+@st.cache_resource(show_spinner=False)
+def _gsheet_resource():
+    # client / spreadsheet ใช้ร่วมกันทุก session ใน process เดียว
+    # (AuthorizedSession ของ google-auth refresh token เองเมื่อหมดอายุ)
+    metrics.inc('cache_misses', cache='gsheet_client')
+    t0 = datetime.now()
+    if "gcp_service_account" in st.secrets:
+        creds_dict = dict(st.secrets["gcp_service_account"])
+        if "\\n" in creds_dict["private_key"]:
+            creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
+        client = gspread.service_account_from_dict(creds_dict)
+    else:
+        client = gspread.service_account(filename='credentials.json')
+
+    # keep-alive: หลาย session ยิง request พร้อมกันได้โดยไม่ต้องเปิด connection ใหม่
+    session = getattr(getattr(client, 'http_client', client), 'session', None)
+    if session is not None:
+        session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32, max_retries=2))
+        metrics.instrument_session(session)
+
+    sh = client.open("Chronos_Data")
+    metrics.observe('connect', (datetime.now() - t0).total_seconds())
+    return sh
+
 def connect_gsheet():
+    metrics.inc('cache_lookups', cache='gsheet_client')
     try:
-        if "gcp_service_account" in st.secrets:
-            creds_dict = dict(st.secrets["gcp_service_account"])
-            if "\\n" in creds_dict["private_key"]:
-                creds_dict["private_key"] = creds_dict["private_key"].replace("\\n", "\n")
-            client = gspread.service_account_from_dict(creds_dict)
-        else:
-            client = gspread.service_account(filename='credentials.json')
-        return client.open("Chronos_Data") 
+        return _gsheet_resource()
     except Exception as e:
         st.error(f"❌ เชื่อมต่อ Google Sheets ไม่ได้: {e}")
         return None
 
+def reset_gsheet():
+    _gsheet_resource.clear()
+
 # ==========================================
 # 3. DATABASE LOGIC
 # ==========================================
-def load_data():
-    sh = connect_gsheet()
-    if sh:
-        try:
-            ws_logs = sh.worksheet('Logs')
-            ws_emps = sh.worksheet('Employees')
-            ws_projs = sh.worksheet('Projects')
-
-            data_logs = ws_logs.get_all_records()
-            data_emps = ws_emps.get_all_records()
-            data_projs = ws_projs.get_all_records()
-
-            df_logs = pd.DataFrame(data_logs)
-            expected_cols = ['Employee', 'Main_Task', 'Sub_Task', 'Start_Date', 'End_Date', 'Output', 'Issue', 'Dependency', 'Progress', 'Score', 'Status']
-            
-            if df_logs.empty: df_logs = pd.DataFrame(columns=expected_cols)
-            else:
-                for col in expected_cols:
-                    if col not in df_logs.columns: df_logs[col] = None
-
-            if not df_logs.empty:
-                for col in ['Start_Date', 'End_Date']:
-                    df_logs[col] = pd.to_datetime(df_logs[col], errors='coerce').dt.date
-                
-                # Force String conversion for text fields
-                df_logs['Issue'] = df_logs['Issue'].astype(str).replace('nan', '')
-                df_logs['Output'] = df_logs['Output'].astype(str).replace('nan', '')
-                
-                df_logs['Progress'] = df_logs['Progress'].fillna(0)
-                df_logs['Score'] = df_logs['Score'].fillna(0)
-                df_logs['Status'] = df_logs['Status'].fillna("⏳ กำลังดำเนินการ")
-
-            emp_list = pd.DataFrame(data_emps)['Name'].tolist() if data_emps else []
-            proj_list = pd.DataFrame(data_projs)['Project'].tolist() if data_projs else []
-
-            return df_logs, emp_list, proj_list
-        except: return pd.DataFrame(columns=expected_cols), [], []
-    return pd.DataFrame(), [], []
-
-def save_data():
-    sh = connect_gsheet()
-    if sh:
-        try:
-            ws_logs = sh.worksheet('Logs')
-            save_df = st.session_state['data'].copy()
-            
-            # Prepare Data
-            save_df = save_df.fillna("") 
-            save_df['Issue'] = save_df['Issue'].astype(str)
-            save_df['Output'] = save_df['Output'].astype(str)
-            save_df['Start_Date'] = save_df['Start_Date'].apply(lambda x: x.strftime('%Y-%m-%d') if isinstance(x, (date, datetime)) else "")
-            save_df['End_Date'] = save_df['End_Date'].apply(lambda x: x.strftime('%Y-%m-%d') if isinstance(x, (date, datetime)) else "")
-            
-            cols = ['Employee', 'Main_Task', 'Sub_Task', 'Start_Date', 'End_Date', 'Output', 'Issue', 'Dependency', 'Progress', 'Score', 'Status']
-            for c in cols: 
-                if c not in save_df.columns: save_df[c] = ""
-            
-            all_values = [cols]
-            if not save_df.empty: all_values.extend(save_df[cols].values.tolist())
-            
-            ws_logs.clear()
-            ws_logs.update(range_name="A1", values=all_values)
-        except Exception as e: print(f"Log Error: {e}")
-
-        try:
-            ws_emps = sh.worksheet('Employees')
-            ws_emps.clear()
-            ws_emps.update(range_name="A1", values=[['Name']] + [[x] for x in st.session_state['employees']])
-        except: pass
-
-        try:
-            ws_projs = sh.worksheet('Projects')
-            ws_projs.clear()
-            ws_projs.update(range_name="A1", values=[['Project']] + [[x] for x in st.session_state['projects']])
-        except: pass
+# เลือก backend ด้วย env TRACKER_BACKEND:
+#   sheets (ค่าเริ่มต้น) | sqlite | sqlite+sheets (SQLite เป็นหลัก + สำเนาบน Sheets) | memory
+# ไฟล์ SQLite กำหนดด้วย TRACKER_DB (ค่าเริ่มต้น chronos.db)
+def make_backend():
+    kind = os.environ.get("TRACKER_BACKEND", "sheets")
+    db_path = os.environ.get("TRACKER_DB", "chronos.db")
+    if kind == "memory": return storage.MemoryBackend()
+    if kind == "sqlite": return storage.SQLiteBackend(db_path)
+    sheets = storage.SheetsBackend(connect_gsheet, reset_gsheet)
+    if kind == "sqlite+sheets": return storage.MirroredBackend(storage.SQLiteBackend(db_path), sheets)
+    return sheets
+
+@st.cache_resource(show_spinner=False)
+def get_store():
+    # งานที่เสร็จแล้วของปีงบที่ปิดแล้วถูกย้ายไป archive อัตโนมัติ (พร้อมผลรวมสำหรับตารางผลงาน)
+    store = storage.DataStore(make_backend(), prepare=scoring.calculate_status_and_score, summarize=reports.year_sums)
+    atexit.register(store.close)
+    return store
+
+def sync_session():
+    # ผูก session เข้ากับ snapshot ล่าสุด (+ overlay ที่ยัง commit ไม่ได้); ไม่ copy ถ้าไม่มี overlay
+    snap = get_store().snapshot()
+    ops = st.session_state.setdefault('overlay', [])
+    key = (snap.version, st.session_state.get('overlay_id'))
+    metrics.lookup('session_frame', hit=st.session_state.get('data_ver') == key)
+    if st.session_state.get('data_ver') == key: return
+    if ops:
+        df, emps, projs = storage.apply_ops(snap, ops)
+        df = scoring.calculate_status_and_score(df)
+    else:
+        df, emps, projs = snap.logs, list(snap.employees), list(snap.projects)
+    st.session_state['data'] = df
+    st.session_state['employees'] = emps
+    st.session_state['projects'] = projs
+    st.session_state['data_ver'] = key
+
+def set_overlay(ops):
+    # data_ver = (เวอร์ชัน snapshot, id ของ overlay) เป็น key ของแคชที่ใช้ร่วมทั้ง process (timeline / กราฟ / ตารางผลงาน)
+    # overlay ของแต่ละ session จึงต้องมี id ไม่ซ้ำกัน; ไม่มี overlay -> None = ใช้แคชของ snapshot ร่วมกันได้
+    st.session_state['overlay'] = ops
+    st.session_state['overlay_id'] = uuid.uuid4().hex if ops else None
+
+def commit(*ops):
+    # WriteConflict ส่งต่อให้ผู้เรียก (dialog) ตัดสิน; error อื่นเก็บ op ไว้ใน overlay รอ commit รอบหน้า
+    before = st.session_state.get('overlay', [])
+    pending = before + list(ops)
+    set_overlay(pending)
+    try:
+        get_store().commit(pending)
+    except storage.WriteConflict:
+        set_overlay([op for op in before if not (op[0] == 'set' and len(op) > 3)])
+        raise
+    except Exception as e:
+        print(f"Save Error: {e}")
+        st.session_state['save_error'] = e
+        return False
+    set_overlay([])
+    st.session_state.pop('save_error', None)
+    return True
+
+def save_failed_text():
+    # commit ไม่สำเร็จ: op ยังค้างใน overlay ของ session นี้ (ลองใหม่พร้อมการบันทึกครั้งถัดไป)
+    return f"❌ บันทึกไม่สำเร็จ: {st.session_state.get('save_error')} (การแก้ไขยังค้างอยู่ จะลองใหม่ตอนบันทึกครั้งถัดไป)"
 
 def update_db(key, list_name):
     val = st.session_state.get(key)
     if val and val not in st.session_state[list_name]:
-        st.session_state[list_name].append(val)
-        save_data()
+        if not commit(('list_add', list_name, val)): return st.toast(save_failed_text(), icon="⚠️")
         st.session_state[key] = ""
         st.toast(f"✅ เพิ่ม '{val}' เรียบร้อย", icon="💾")
 
 def delete_db(key, list_name):
     val = st.session_state.get(key)
     if val and val in st.session_state[list_name]:
-        st.session_state[list_name].remove(val)
-        if list_name == 'projects':
-            df = st.session_state['data']
-            st.session_state['data'] = df[df['Main_Task'] != val].reset_index(drop=True)
-        elif list_name == 'employees':
-             df = st.session_state['data']
-             st.session_state['data'] = df[df['Employee'] != val].reset_index(drop=True)
-        save_data()
+        col = 'Main_Task' if list_name == 'projects' else 'Employee'
+        if not commit(('list_remove', list_name, val), ('drop_where', col, val)): return st.toast(save_failed_text(), icon="⚠️")
         st.cache_data.clear()
         st.toast(f"🗑️ ลบ '{val}' แล้ว", icon="🗑️")
 
 # ==========================================
-# 4. INITIALIZE
+# 4. HELPER
 # ==========================================
-if 'data' not in st.session_state:
-    logs, emps, projs = load_data()
-    if logs is not None:
-        st.session_state['data'] = logs
-        st.session_state['employees'] = emps
-        st.session_state['projects'] = projs
-    else:
-        st.session_state['data'] = pd.DataFrame()
-        st.session_state['employees'] = []
-        st.session_state['projects'] = []
+def counted(cache, name):
+    # ห่อ st.cache_* ให้นับ lookup / miss (ตัวฟังก์ชันจริงทำงานเฉพาะตอน miss)
+    def deco(fn):
+        @functools.wraps(fn)
+        def miss(*args, **kwargs):
+            metrics.inc('cache_misses', cache=name)
+            with metrics.timer('build', part=name): return fn(*args, **kwargs)
+        cached = cache(miss)
+        @functools.wraps(fn)
+        def lookup(*args, **kwargs):
+            metrics.inc('cache_lookups', cache=name)
+            return cached(*args, **kwargs)
+        lookup.clear = cached.clear
+        return lookup
+    return deco
+
+# แคช timeline ตาม (เวอร์ชันข้อมูล, ตัวกรอง): rerun ที่ไม่ได้แก้ข้อมูลไม่ต้องคำนวณ/สร้างกราฟใหม่
+@counted(st.cache_data(show_spinner=False, max_entries=32), 'timeline_rows')
+def timeline_rows_cached(_df, data_ver, emps, group_by, start, end):
+    return reports.timeline_rows(_df[_df['Employee'].isin(emps)], group_by, start, end)
+
+@counted(st.cache_data(show_spinner=False, max_entries=32), 'timeline_figure')
+def timeline_figure_cached(_rows, data_ver, emps, group_by, start, end, page, today):
+    size = reports.GANTT_PAGE_SIZE
+    return reports.timeline_figure(_rows.iloc[page * size:(page + 1) * size], start, end, today)
+
+# กราฟ Dependency สร้างครั้งเดียวต่อเวอร์ชันข้อมูล (ใช้ร่วมกันทุก session ที่เห็นเวอร์ชันเดียวกัน)
+@counted(st.cache_resource(max_entries=4, show_spinner=False), 'task_graph')
+def task_graph(_df, data_ver):
+    return taskgraph.TaskGraph(_df)
+
+def get_graph(): return task_graph(st.session_state['data'], st.session_state['data_ver'])
+
+# ตารางผลงานใช้ร่วมกันทุก session: sync จะคำนวณเฉพาะงานที่ต่างจากรอบก่อน
+@st.cache_resource
+def get_leaderboard():
+    return reports.Leaderboard()
+
+def log_entry(task, text):
+    # แถวของ Log Book (storage.LOGBOOK_COLS)
+    return [str(task[c]) for c in storage.TASK_KEY] + [datetime.now().strftime("%Y-%m-%d %H:%M"), text]
+
+def load_history(row):
+    # dialog rerun ทุกครั้งที่กดอะไรข้างใน -> โหลดประวัติครั้งเดียวต่องานต่อจำนวนบันทึก
+    key = (row['_rid'], int(row['Log_Count']))
+    cached = st.session_state.get('log_history')
+    if cached and cached[0] == key: return cached[1]
+    try:
+        rows = get_store().history(row['Employee'], row['Main_Task'], row['Sub_Task'])
+    except Exception as e:
+        print(f"Load Error: {e}")
+        return None
+    st.session_state['log_history'] = (key, rows)
+    return rows
+
+def admin_panel():
+    last = st.session_state.get('last_run') or {}
+    st.caption("รอบก่อนหน้า (ms)")
+    st.dataframe(pd.DataFrame({'ช่วง': list(last), 'ms': [round(v * 1000, 1) for v in last.values()]}),
+                 hide_index=True, use_container_width=True)
+
+    api = metrics.REGISTRY.rows('sheets_api_latency')
+    if api:
+        calls = {l['api']: 0 for l, _ in api}
+        for l, v in metrics.REGISTRY.rows('sheets_api_calls'): calls[l['api']] = calls.get(l['api'], 0) + v
+        sent = {l['api']: v for l, v in metrics.REGISTRY.rows('sheets_api_bytes_sent')}
+        recv = {l['api']: v for l, v in metrics.REGISTRY.rows('sheets_api_bytes_received')}
+        st.caption("Google API")
+        st.dataframe(pd.DataFrame([
+            {'api': l['api'], 'ครั้ง': int(calls[l['api']]), 'เฉลี่ย ms': round(v[1] / v[0] * 1000, 1), 'สูงสุด ms': round(v[2] * 1000, 1),
+             'KB ส่ง': round(sent.get(l['api'], 0) / 1024, 1), 'KB รับ': round(recv.get(l['api'], 0) / 1024, 1)}
+            for l, v in api]), hide_index=True, use_container_width=True)
+
+    misses = {l['cache']: v for l, v in metrics.REGISTRY.rows('cache_misses')}
+    lookups = metrics.REGISTRY.rows('cache_lookups')
+    if lookups:
+        st.caption("แคช")
+        st.dataframe(pd.DataFrame([
+            {'แคช': l['cache'], 'เรียก': int(v), 'hit %': round(100 * (1 - misses.get(l['cache'], 0) / v), 1)}
+            for l, v in lookups]), hide_index=True, use_container_width=True)
+
+    store = metrics.REGISTRY.rows('store')
+    if store:
+        st.caption(f"Backend ({get_store().backend.name})")
+        st.dataframe(pd.DataFrame([{'op': l['op'], 'ครั้ง': v[0], 'เฉลี่ย ms': round(v[1] / v[0] * 1000, 1),
+                                    'สูงสุด ms': round(v[2] * 1000, 1)} for l, v in store]),
+                     hide_index=True, use_container_width=True)
+
+    st.download_button("⬇️ Prometheus metrics", metrics.REGISTRY.prometheus(), file_name="tracker_metrics.txt",
+                       use_container_width=True)
+
+def import_file(upload):
+    # ตรวจ/คำนวณทีละชุด แล้ว commit เป็นไม่กี่ op ใหญ่ (ไม่ใช่ทีละแถวแบบฟอร์ม)
+    store = get_store()
+    note = st.empty()
+    try:
+        with st.spinner("กำลังนำเข้า..."):
+            res = bulk.import_tasks(upload, upload.name, st.session_state['employees'], st.session_state['projects'],
+                                    store.commit, store.new_ids, progress=lambda n: note.caption(f"ตรวจแล้ว {n:,} แถว"))
+    except Exception as e:
+        st.error(f"นำเข้าไม่สำเร็จ: {e}")
+        return
+    st.session_state['import_result'] = res
+    st.session_state['import_n'] = st.session_state.get('import_n', 0) + 1  # key ใหม่ = ล้างไฟล์ที่อัปโหลด กันนำเข้าซ้ำ
+    st.rerun()
+
+def import_report():
+    res = st.session_state.pop('import_result', None)
+    if res is None: return
+    st.success(f"✅ นำเข้า {res.added:,} งาน จาก {res.rows:,} แถว")
+    if res.statuses:
+        st.dataframe(pd.DataFrame({THAI_COLS['Status']: list(res.statuses), 'จำนวน': list(res.statuses.values())}),
+                     hide_index=True, use_container_width=True)
+    if res.rows > res.added:
+        st.warning(f"ข้าม {res.rows - res.added:,} แถวที่ไม่ผ่านการตรวจ" + (f" (แสดง {len(res.errors)} แถวแรก)" if res.rows - res.added > len(res.errors) else ""))
+        st.dataframe(pd.DataFrame(res.errors, columns=['แถวในไฟล์', 'ปัญหา']), hide_index=True, use_container_width=True)
+
+# ==========================================
+# 5. INITIALIZE
+# ==========================================
+with run.phase('sync_session'): sync_session()
 
 keys = ['k_d_start', 'k_d_end', 'k_prog', 'k_sub', 'k_out', 'k_issue', 'k_emps_multi']
 defaults = [datetime.now(), datetime.now(), 0, "", "", "", []]
-for k, v in zip(keys, defaults):
-    if k not in st.session_state: st.session_state[k] = v
+# เขียนค่ากลับทุกรอบ: ฟอร์มที่กรอกค้างไว้ไม่หายตอนสลับไปหน้าอื่น (Streamlit ล้าง state ของ widget ที่ไม่ได้วาด)
+for k, v in zip(keys, defaults): st.session_state[k] = st.session_state.get(k, v)
+for k in ('k_proj_sel', 'k_dep_sel'):
+    if k in st.session_state: st.session_state[k] = st.session_state[k]
 
-# ==========================================
-# 5. HELPER
-# ==========================================
-def calculate_status_and_score(df):
-    if df.empty: return df
-    today = date.today()
-    def get_details(row):
-        try:
-            s = row['Start_Date']
-            e = row['End_Date']
-            if isinstance(s, str) and s: s = datetime.strptime(s, '%Y-%m-%d').date()
-            if isinstance(e, str) and e: e = datetime.strptime(e, '%Y-%m-%d').date()
-            if not isinstance(s, date) or not isinstance(e, date): return "❓ วันที่ระบุไม่ครบ", 0
-            
-            if row['Progress'] == 100: return "✅ เสร็จสิ้น", 100
-            elif today < s: return "🔜 ยังไม่ถึงกำหนดเริ่ม", None
-            elif today > e: return "🔥 ล่าช้า (Late)", row['Progress']
-            else: return "⏳ กำลังดำเนินการ", 100
-        except: return "Error", 0
-    res = df.apply(get_details, axis=1, result_type='expand')
-    df['Status'] = res[0]
-    df['Score'] = res[1]
-    return df
-
-st.session_state['data'] = calculate_status_and_score(st.session_state['data'])
+LEADERBOARD_CARDS = 5
+LEADERBOARD_PAGE_SIZE = 25
 
 THAI_COLS = {
-    "Employee": "พนักงาน", "Main_Task": "โปรเจกต์", "Sub_Task": "ชื่องาน",
-    "Progress": "ความคืบหน้า", "Status": "สถานะ", "End_Date": "กำหนดส่ง",
-    "Issue": "บันทึก", "Score": "คะแนน", "Total": "งานทั้งหมด",
+    "Employee": "พนักงาน", "Main_Task": "โปรเจกต์", "Sub_Task": "ชื่องาน", "Output": "ผลลัพธ์",
+    "Progress": "ความคืบหน้า", "Status": "สถานะ", "Start_Date": "วันเริ่ม", "End_Date": "กำหนดส่ง",
+    "Issue": "บันทึกล่าสุด", "Log_Count": "จำนวนบันทึก", "Score": "คะแนน", "Total": "งานทั้งหมด",
     "Avg": "คะแนนเฉลี่ย", "OnTime%": "ส่งตรงเวลา (%)", "Grade": "เกรด", "Late": "งานล่าช้า"
 }
 
 # ==========================================
 # 6. DIALOG
 # ==========================================
+def resolve_conflict(rid, row_id, ops):
+    # callback: ทำงานก่อน rerun ถ้าค่าล่าสุดเปลี่ยนอีก จะแสดง conflict ชุดใหม่ได้ทันที
+    try:
+        if ops and not commit(*ops): return st.toast(save_failed_text(), icon="⚠️")
+    except storage.WriteConflict as e:
+        st.session_state['conflict'] = (rid, e.conflicts, ops)
+        return
+    st.session_state.pop('conflict', None)
+    get_store().resolve(row_id)
+    st.session_state['conflict_resolved'] = rid
+
+def conflict_panel(row_data):
+    """ช่องที่ชนกับการแก้ของคนอื่น: จากการกดบันทึกใน dialog นี้ หรือจากการเขียนเบื้องหลัง (rebase)
+
+    คืน True ถ้ามี conflict ค้างอยู่ (ซ่อนฟอร์มแก้ไขจนกว่าจะเลือก)
+    """
+    rid, row_id = row_data['_rid'], row_data['Row_ID']
+    if st.session_state.get('conflict_resolved') == rid:
+        del st.session_state['conflict_resolved']
+        st.toast("บันทึกแล้ว", icon="💾")
+        st.rerun()
+    pending = st.session_state.get('conflict')
+    if pending and pending[0] == rid: _, conflicts, ops = pending
+    else:
+        conflicts = get_store().conflicts.get(row_id)
+        if not conflicts: return False
+        conflicts = [{**c, 'rid': rid} for c in conflicts]  # ใช้ _rid ของแถวที่เห็นอยู่ (เปลี่ยนทุกครั้งที่โหลดใหม่)
+        ops = [('set', c['rid'], {c['col']: c['mine']}, {c['col']: c['theirs']}) for c in conflicts if c['col']]
+    keep_logs = [op for op in ops if op[0] == 'log']
+
+    if any(c['col'] is None and c['mine'] == storage.ROW_DELETED for c in conflicts):
+        # เราลบ แต่มีคนแก้งานนี้ไปก่อน -> งานยังอยู่ตามค่าล่าสุด ลบซ้ำได้ถ้ายังต้องการ
+        st.warning("⚠️ มีคนแก้งานนี้ระหว่างที่คุณลบ งานจึงยังไม่ถูกลบ (แสดงค่าล่าสุด)")
+        st.button("รับทราบ", use_container_width=True, on_click=resolve_conflict, args=(rid, row_id, []))
+        return True
+    if any(c['col'] is None for c in conflicts):
+        st.error("งานนี้ถูกลบไปแล้วระหว่างที่คุณแก้")
+        st.button("ปิด", use_container_width=True, on_click=resolve_conflict, args=(rid, row_id, keep_logs))
+        return True
+    st.warning("⚠️ มีคนแก้งานนี้ไปก่อน ช่องด้านล่างชนกับที่คุณแก้ (ช่องอื่นรวมให้แล้ว)")
+    st.dataframe(pd.DataFrame([{'ช่อง': THAI_COLS.get(c['col'], c['col']), 'ค่าของคุณ': storage.cell_text(c['col'], c['mine']),
+                                'ค่าล่าสุด': storage.cell_text(c['col'], c['theirs'])} for c in conflicts]),
+                 hide_index=True, use_container_width=True)
+    k1, k2 = st.columns(2)
+    k1.button("ใช้ค่าของฉัน", type="primary", use_container_width=True,
+              on_click=resolve_conflict, args=(rid, row_id, storage.prefer_mine(ops, conflicts)))
+    # ใช้ค่าล่าสุด: ทิ้งค่าที่แก้ แต่บันทึกใน Log Book ไม่หาย
+    k2.button("ใช้ค่าล่าสุด", use_container_width=True, on_click=resolve_conflict, args=(rid, row_id, keep_logs))
+    return True
+
 @st.dialog("📝 จัดการงาน")
 def update_task_dialog(index, row_data):
     st.caption(f"{row_data['Sub_Task']} ({row_data['Employee']})")
+    if conflict_panel(row_data): return
+    top = st.container()
     
     new_prog = st.slider("ความคืบหน้า (%)", 0, 100, int(row_data['Progress']))
     new_output = st.text_input("ผลลัพธ์ / ลิงก์", value=str(row_data['Output']))
+
+    c_s, c_e = st.columns(2)
+    new_start = c_s.date_input("เริ่ม", value=row_data['Start_Date'] if pd.notna(row_data['Start_Date']) else None)
+    new_end = c_e.date_input("ถึง", value=row_data['End_Date'] if pd.notna(row_data['End_Date']) else None)
+    task = (row_data['Main_Task'], row_data['Sub_Task'])
+    downstream = get_graph().downstream(*task)
+    cascade = bool(downstream) and st.checkbox(f"เลื่อนงานที่รอต่อ ({len(downstream)} งาน) ตามไปด้วย", value=True)
     
     st.markdown("---")
     
-    # Handle Issue
-    issue_val = str(row_data['Issue'])
-    if issue_val == "nan" or issue_val == "None": issue_val = ""
-    
-    current_log = issue_val
-    mode = st.radio("Log Book:", ["➕ เพิ่มบันทึก", "✏️ แก้ไขทั้งหมด"], horizontal=True)
-    
-    final_log = current_log
-    if "เพิ่มบันทึก" in mode:
-        if current_log: st.info(current_log)
-        new_entry = st.text_area("บันทึกวันนี้:", height=80)
-    else:
-        full_edit = st.text_area("แก้ไขประวัติ:", value=current_log, height=150)
+    # Log Book: ประวัติเต็มโหลดจาก backend เฉพาะตอนเปิด dialog
+    n_logs = int(row_data['Log_Count'])
+    st.markdown(f"**Log Book** ({n_logs} รายการ)")
+    if n_logs:
+        history = load_history(row_data)
+        if history is None:
+            st.warning("โหลดประวัติไม่สำเร็จ แสดงเฉพาะบันทึกล่าสุด")
+            st.info(row_data['Issue'])
+        else:
+            with st.container(height=180):
+                for ts, entry in history: st.markdown(f"- **[{ts}]** {entry}" if ts else f"- {entry}")
+    new_entry = st.text_area("บันทึกวันนี้:", height=80)
 
     st.markdown("---")
     
     c1, c2 = st.columns(2)
     if c1.button("💾 บันทึก", type="primary", use_container_width=True):
-        if "เพิ่มบันทึก" in mode and new_entry.strip():
-            ts = datetime.now().strftime("%d/%m")
-            final_log += f"\n- [{ts}] {new_entry.strip()}"
-        elif "แก้ไข" in mode: final_log = full_edit
-        
-        st.session_state['data'].at[index, 'Progress'] = new_prog
-        st.session_state['data'].at[index, 'Output'] = new_output
-        st.session_state['data'].at[index, 'Issue'] = final_log.strip()
-        save_data()
-        st.toast("บันทึกแล้ว", icon="💾")
-        st.rerun()
+        vals = {'Progress': new_prog, 'Output': new_output, 'Start_Date': new_start, 'End_Date': new_end}
+        # ส่งค่าตอนเปิด dialog ไปด้วย: เขียนเฉพาะช่องที่แก้ และตรวจว่ามีคนแก้ช่องเดียวกันไปก่อนหรือไม่
+        ops = [('set', row_data['_rid'], vals, {c: row_data[c] for c in vals})]
+        if new_entry.strip(): ops.append(('log', [log_entry(row_data, new_entry.strip())]))
+        # งานปลายน้ำทั้งหมดถูกเลื่อนใน op เดียว -> เขียนลง backend เป็น batch เดียว
+        # เลื่อนเฉพาะเมื่อกำหนดส่งเปลี่ยนจริง (บันทึกแค่ความคืบหน้าไม่ต้องจัดตารางงานที่รอต่อใหม่)
+        old_end = row_data['End_Date']
+        end_changed = bool(new_end) and (pd.isna(old_end) or pd.Timestamp(new_end) != pd.Timestamp(old_end).normalize())
+        if cascade and end_changed:
+            shifted = get_graph().shift_plan(*task, new_end)
+            if not shifted.empty: ops.append(('set_many', shifted))
+        try: saved = commit(*ops)
+        except storage.WriteConflict as e:
+            st.session_state['conflict'] = (row_data['_rid'], e.conflicts, ops)
+            with top: conflict_panel(row_data)
+        else:
+            if not saved: st.error(save_failed_text())
+            else:
+                st.toast("บันทึกแล้ว", icon="💾")
+                st.rerun()
             
     if c2.button("ยกเลิก", use_container_width=True): st.rerun()
     if st.button("🗑️ ลบงานนี้", type="secondary", use_container_width=True):
-        st.session_state['data'] = st.session_state['data'].drop(index).reset_index(drop=True)
-        save_data() 
-        st.toast("ลบงานแล้ว", icon="🗑️")
-        st.rerun()
+        if not commit(('drop', [row_data['_rid']])): st.error(save_failed_text())
+        else:
+            st.toast("ลบงานแล้ว", icon="🗑️")
+            st.rerun()
 
 # ==========================================
 # 7. MAIN UI
 # ==========================================
 def auto_update_date():
     p, d = st.session_state.get('k_proj_sel'), st.session_state.get('k_dep_sel')
-    if p and d and d != "- เริ่มต้นใหม่ (ไม่รอใคร) -":
-        df = st.session_state['data']
-        row = df[(df['Main_Task'] == p) & (df['Sub_Task'] == d)]
-        if not row.empty:
-            ed = row.iloc[0]['End_Date']
-            if isinstance(ed, str): ed = datetime.strptime(ed, '%Y-%m-%d').date()
-            if isinstance(ed, (date, datetime)):
-                st.session_state.k_d_start = ed + timedelta(days=1)
-                st.session_state.k_d_end = ed + timedelta(days=1)
+    if p and d and d not in taskgraph.NO_DEPENDENCY:
+        ed = get_graph().end_of(p, d)
+        if pd.notna(ed):
+            st.session_state.k_d_start = ed.date() + timedelta(days=1)
+            st.session_state.k_d_end = ed.date() + timedelta(days=1)
 
 def submit_work():
     emps = st.session_state.k_emps_multi
@@ -263,11 +440,14 @@ def submit_work():
                 'Employee': emp, 'Main_Task': st.session_state.k_proj_sel, 
                 'Sub_Task': st.session_state.k_sub, 'Start_Date': st.session_state.k_d_start, 
                 'End_Date': st.session_state.k_d_end, 'Output': st.session_state.k_out, 
-                'Issue': st.session_state.k_issue, 'Dependency': st.session_state.k_dep_sel, 
+                'Dependency': st.session_state.k_dep_sel, 
                 'Progress': st.session_state.k_prog
             })
-        st.session_state['data'] = pd.concat([st.session_state['data'], calculate_status_and_score(pd.DataFrame(new_rows))], ignore_index=True)
-        save_data()
+        new_df = scoring.calculate_status_and_score(storage.coerce_logs(pd.DataFrame(new_rows)))
+        new_df['_rid'] = get_store().new_ids(len(new_df))
+        note = st.session_state.k_issue.strip()
+        if not commit(('add', new_df), *([('log', [log_entry(r, note) for r in new_rows])] if note else [])):
+            return st.toast(save_failed_text(), icon="⚠️")  # ฟอร์มยังอยู่ครบ
         st.session_state.k_sub = ""
         st.session_state.k_out = ""
         st.session_state.k_issue = ""
@@ -276,17 +456,40 @@ def submit_work():
         st.toast(f"✅ เพิ่มงานเรียบร้อย ({len(emps)} คน)", icon="💾")
     else: st.toast("❌ ข้อมูลไม่ครบ", icon="⚠️")
 
+@st.fragment(run_every=5)
+def sync_badge():
+    store = get_store()
+    state, detail, wait = store.sync_state()
+    lost = store.lost_edits()
+    if len(store.conflicts) > len(lost):
+        st.caption(f"⚠️ ข้อมูลชนกัน {len(store.conflicts) - len(lost)} งาน (เปิดงานในหน้าอัพเดตเพื่อเลือกค่า)")
+    for row_id, task in lost.items():
+        # งานถูกลบระหว่างที่แก้ -> ไม่มีแถวให้เปิด แจ้งที่นี่แทนจนกว่าจะกดรับทราบ
+        c1, c2 = st.columns([3, 1])
+        c1.caption(f"🗑️ {task} ถูกลบไปแล้วระหว่างที่คุณแก้ (การแก้ไม่ได้บันทึก)")
+        c2.button("รับทราบ", key=f"lost_{row_id}", on_click=store.resolve, args=(row_id,))
+    if store.archive_error: st.caption(f"⚠️ ย้ายงานปีที่ปิดแล้วไป archive ไม่สำเร็จ (ลองใหม่รอบหน้า): {store.archive_error}")
+    if store.load_error: st.caption(f"⚠️ โหลดข้อมูลจาก {store.backend.name} ไม่สำเร็จ: {store.load_error}")
+    unsaved = len(st.session_state.get('overlay', []))
+    if unsaved: st.caption(f"⚠️ การแก้ไข {unsaved} รายการยังไม่ได้บันทึก (ลองใหม่ตอนบันทึกครั้งถัดไป): {st.session_state.get('save_error')}")
+    if state == 'synced':
+        if not unsaved and not store.load_error: st.caption(f"✅ บันทึกลง {store.backend.name} แล้ว")
+    elif state == 'pending': st.caption("⏳ กำลังบันทึก...")
+    else:
+        retry = f" (ลองใหม่ใน {wait} วิ)" if wait is not None else ""
+        st.caption(f"⚠️ บันทึกไม่สำเร็จ{retry}: {detail}")
+
 # --- SIDEBAR ---
-with st.sidebar:
+with st.sidebar, run.phase('sidebar'):
     st.header("⚙️ ตั้งค่า")
+    sync_badge()
     if st.button("🔄 รีเฟรชข้อมูล", use_container_width=True):
         st.cache_data.clear()
-        logs, emps, projs = load_data()
-        if logs is not None:
-            st.session_state['data'] = logs
-            st.session_state['employees'] = emps
-            st.session_state['projects'] = projs
+        # โหลดใหม่ให้ทุก session เฉพาะเมื่อชีตถูกแก้; op ที่ค้างของ session นี้อ้าง rid เดิมจึงทิ้งไป
+        if get_store().refresh():
+            set_overlay([])
             st.rerun()
+        else: st.toast("ข้อมูลเป็นปัจจุบันแล้ว", icon="✅")
 
     st.divider()
     all_emps = st.session_state['employees']
@@ -304,18 +507,18 @@ with st.sidebar:
             st.selectbox("ลบงาน", st.session_state['projects'], key='del_proj')
             st.button("ลบงาน", on_click=delete_db, args=('del_proj', 'projects'))
 
-# --- MAIN TABS ---
-tab1, tab2, tab3, tab4 = st.tabs(["📝 ลงทะเบียน", "📊 แผนผัง", "🛠️ อัพเดต", "🏆 ผลงาน"])
+    if ADMIN:
+        with st.expander("📈 ประสิทธิภาพ (Admin)"): admin_panel()
 
-with tab1:
+# --- MAIN VIEWS ---
+# แต่ละหน้าเป็นฟังก์ชัน และรันเฉพาะหน้าที่เลือก (st.tabs รันทุกแท็บทุกครั้งที่ rerun)
+def view_form():
     with st.container():
         p = st.selectbox("โปรเจกต์", st.session_state['projects'] or ["ไม่มีข้อมูล"], key="k_proj_sel")
         st.text_input("ชื่องาน", key="k_sub", placeholder="เช่น ออกแบบ UX/UI")
         
-        df = st.session_state['data']
         dep_opt = ["- เริ่มใหม่ -"]
-        if not df.empty and p != "ไม่มีข้อมูล":
-            dep_opt += df[df['Main_Task'] == p].sort_values('End_Date', ascending=False)['Sub_Task'].unique().tolist()
+        if p != "ไม่มีข้อมูล": dep_opt += get_graph().tasks(p)
         st.selectbox("รอต่องานไหน?", dep_opt, key="k_dep_sel", on_change=auto_update_date)
         
         st.multiselect("ผู้รับผิดชอบ", st.session_state['employees'], key="k_emps_multi")
@@ -332,71 +535,86 @@ with tab1:
             
         st.button("บันทึกข้อมูล", on_click=submit_work, type="primary", use_container_width=True)
 
-with tab2:
-    df = calculate_status_and_score(st.session_state['data'].copy())
-    if not df.empty: df = df[df['Employee'].isin(sel_emps)]
-    
+    with st.expander("📥 นำเข้าจากไฟล์ (.xlsx / .csv)", expanded='import_result' in st.session_state):
+        st.caption(f"หัวตาราง: {', '.join(bulk.REQUIRED_COLS)} (ไม่บังคับ: {', '.join(bulk.OPTIONAL_COLS)}) "
+                   "วันที่แบบ YYYY-MM-DD ชื่อพนักงาน/โปรเจกต์ต้องมีในระบบแล้ว")
+        upload = st.file_uploader("ไฟล์งาน", type=['xlsx', 'csv'], key=f"k_import_file_{st.session_state.get('import_n', 0)}")
+        if upload is not None and st.button("นำเข้า", type="primary", use_container_width=True): import_file(upload)
+        import_report()
+
+def view_timeline():
+    df = st.session_state['data']
     if not df.empty:
-        df['Start'] = pd.to_datetime(df['Start_Date'], errors='coerce')
-        df['End'] = pd.to_datetime(df['End_Date'], errors='coerce')
-        df = df.dropna(subset=['Start', 'End'])
-        df['Visual_End'] = df['End'] + pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
-        df['Label'] = df['Progress'].astype(str) + "%"
-        
-        chart_height = 300 + (len(df) * 30)
-        
-        # -----------------------------------------------
-        # [แก้ไข] เพิ่มการแยกกลุ่มและสีที่ชัดเจน
-        # -----------------------------------------------
-        fig = px.timeline(
-            df, 
-            x_start="Start", 
-            x_end="Visual_End", 
-            y="Sub_Task", 
-            color="Employee", 
-            text="Label", 
-            height=chart_height,
-            color_discrete_sequence=px.colors.qualitative.Bold, # เปลี่ยนชุดสีให้ชัด
-            opacity=0.9
-        )
-        fig.update_yaxes(autorange="reversed", title="")
-        fig.update_layout(
-            barmode='group', # สำคัญมาก! ทำให้แท่งกราฟไม่ทับกัน
-            margin=dict(l=10, r=10, t=10, b=10),
-            legend=dict(orientation="h", y=-0.2)
-        )
-        fig.add_vline(x=datetime.now().timestamp()*1000, line_dash="dash", line_color="red")
-        st.plotly_chart(fig, use_container_width=True)
-        
-        with st.expander("ดูตารางรายละเอียด"):
-            def highlight(row): return ['background-color: #ffcccc'] * len(row) if "ล่าช้า" in str(row['Status']) else [''] * len(row)
-            st.dataframe(
-                df[['Sub_Task', 'Employee', 'Progress', 'Status', 'End_Date']].style.apply(highlight, axis=1), 
-                use_container_width=True, hide_index=True,
-                column_config={
-                    "Sub_Task": st.column_config.TextColumn(THAI_COLS["Sub_Task"]),
-                    "Employee": st.column_config.TextColumn(THAI_COLS["Employee"]),
-                    "Progress": st.column_config.ProgressColumn(THAI_COLS["Progress"], format="%d%%"),
-                    "End_Date": st.column_config.DateColumn(THAI_COLS["End_Date"])
-                }
-            )
+        c1, c2, c3 = st.columns([3, 3, 1])
+        group_by = c1.radio("มุมมอง", list(reports.GANTT_GROUPS), format_func=reports.GANTT_GROUPS.get, horizontal=True, key="k_gantt_group")
+        today = date.today()
+        win = c2.date_input("ช่วงวันที่", value=(today - timedelta(days=90), today + timedelta(days=90)), key="k_gantt_win")
+        # ระหว่างเลือกช่วง date_input คืนค่าวันเดียว
+        win_start, win_end = (win[0], win[-1]) if win else (today, today)
+
+        ver, emps = st.session_state['data_ver'], tuple(sel_emps)
+        rows = timeline_rows_cached(df, ver, emps, group_by, win_start, win_end)
+        size = reports.GANTT_PAGE_SIZE
+        n_pages = max(1, -(-len(rows) // size))
+        page = c3.selectbox("หน้า", range(1, n_pages + 1)) - 1
+
+        if rows.empty: st.info("ไม่มีงานในช่วงวันที่นี้")
+        else:
+            st.plotly_chart(timeline_figure_cached(rows, ver, emps, group_by, win_start, win_end, page, today), use_container_width=True)
+            shown = rows.iloc[page * size:(page + 1) * size]
+            st.caption(f"แสดง {page * size + 1}-{page * size + len(shown)} จาก {len(rows)} แถว")
+
+            with st.expander("ดูตารางรายละเอียด"):
+                def highlight(row): return ['background-color: #ffcccc'] * len(row) if row['Late'] else [''] * len(row)
+                if group_by == 'Sub_Task':
+                    cols = ['Sub_Task', 'Employee', 'Progress', 'Status', 'End_Date', 'Late']
+                    labels = {"Sub_Task": st.column_config.TextColumn(THAI_COLS["Sub_Task"]),
+                              "Employee": st.column_config.TextColumn(THAI_COLS["Employee"]),
+                              "End_Date": st.column_config.DateColumn(THAI_COLS["End_Date"])}
+                else:
+                    cols = [group_by, 'Tasks', 'Progress', 'Start', 'End', 'Late']
+                    labels = {group_by: st.column_config.TextColumn(THAI_COLS[group_by]),
+                              "Tasks": st.column_config.NumberColumn("จำนวนงาน"),
+                              "Start": st.column_config.DateColumn(THAI_COLS["Start_Date"]),
+                              "End": st.column_config.DateColumn(THAI_COLS["End_Date"])}
+                st.dataframe(
+                    shown[cols].style.apply(highlight, axis=1),
+                    use_container_width=True, hide_index=True,
+                    column_order=cols[:-1],
+                    column_config={**labels, "Progress": st.column_config.ProgressColumn(THAI_COLS["Progress"], format="%d%%")}
+                )
+                # สร้างไฟล์ตอนกดเท่านั้น (ทุกหน้าตามตัวกรองปัจจุบัน)
+                st.download_button("⬇️ ส่งออก CSV (ทุกหน้า)", lambda: bulk.to_csv(rows[cols]), file_name=f"timeline_{group_by}.csv",
+                                   mime="text/csv", use_container_width=True)
+
+        with st.expander("🧭 เส้นทางวิกฤต (Critical Path)"):
+            cp_proj = st.selectbox("โปรเจกต์", st.session_state['projects'] or ["ไม่มีข้อมูล"], key="k_cp_proj")
+            path, days = get_graph().critical_path(cp_proj)
+            if path: st.markdown(f"{' → '.join(path)}  \n**รวม {days} วัน**")
+            else: st.caption("ไม่มีงานในโปรเจกต์นี้")
     else: st.info("ไม่มีข้อมูล")
 
-with tab3:
+def view_update():
     st.info("👆 คลิกเลือกงานในตาราง -> จะมีปุ่ม 'แก้ไข' โผล่มาด้านล่าง")
-    df = calculate_status_and_score(st.session_state['data'])
+    df = st.session_state['data']
     if not df.empty:
         event = st.dataframe(
-            df[['Sub_Task', 'Employee', 'Issue', 'Progress', 'Status']], 
+            df[['Sub_Task', 'Employee', 'Issue', 'Log_Count', 'Progress', 'Status']], 
             use_container_width=True, on_select="rerun", selection_mode="single-row", hide_index=True,
             column_config={
                 "Sub_Task": st.column_config.TextColumn(THAI_COLS["Sub_Task"]),
                 "Employee": st.column_config.TextColumn(THAI_COLS["Employee"]),
                 "Issue": st.column_config.TextColumn(THAI_COLS["Issue"], width="medium"),
+                "Log_Count": st.column_config.NumberColumn(THAI_COLS["Log_Count"]),
                 "Progress": st.column_config.ProgressColumn(THAI_COLS["Progress"], format="%d%%"),
                 "Status": st.column_config.TextColumn(THAI_COLS["Status"])
             }
         )
+        c_csv, c_xlsx = st.columns(2)
+        c_csv.download_button("⬇️ ส่งออกงาน (CSV)", lambda: bulk.to_csv(df, bulk.TASK_EXPORT_COLS), file_name="tasks.csv",
+                              mime="text/csv", use_container_width=True)
+        c_xlsx.download_button("⬇️ ส่งออกงาน (Excel)", lambda: bulk.to_xlsx([('Tasks', df[bulk.TASK_EXPORT_COLS])]),
+                               file_name="tasks.xlsx", use_container_width=True)
         if event.selection.rows:
             idx = event.selection.rows[0]
             selected_task_name = df.iloc[idx]['Sub_Task']
@@ -404,52 +622,38 @@ with tab3:
                 update_task_dialog(idx, df.iloc[idx])
     else: st.info("ไม่มีงาน")
 
-with tab4:
-    df = calculate_status_and_score(st.session_state['data'].copy())
-    if not df.empty:
-        df['Year'] = pd.to_datetime(df['End_Date'], errors='coerce').dt.year
-        yrs = df['Year'].dropna().unique().tolist()
+def archived_tasks(year):
+    # งานของปีที่เก็บถาวร: โหลดเฉพาะเมื่อผู้ใช้ขอดู (แคชร่วมทุก session ใน store)
+    if not st.toggle(f"📦 แสดงงานที่เก็บถาวรของปี {year}", key=f"k_archive_{year}"): return
+    with st.spinner("กำลังโหลดงานที่เก็บถาวร..."): arch = get_store().archived(year)
+    st.dataframe(arch[bulk.TASK_EXPORT_COLS], use_container_width=True, hide_index=True,
+                 column_config={c: THAI_COLS[c] for c in bulk.TASK_EXPORT_COLS if c in THAI_COLS})
+    st.download_button(f"⬇️ งานปี {year} (CSV)", lambda: bulk.to_csv(arch, bulk.TASK_EXPORT_COLS),
+                       file_name=f"tasks_{year}.csv", mime="text/csv")
+
+def view_leaderboard():
+    df = st.session_state['data']
+    archive, archive_ver = get_store().archive_state()
+    if not df.empty or not archive.empty:
+        lb = get_leaderboard()
+        lb.sync(df, st.session_state['data_ver'])
+        lb.sync_archive(archive, archive_ver)
+        yrs = lb.years()
         if yrs:
-            sy = st.selectbox("ปีงบประมาณ", sorted(yrs, reverse=True))
-            dfy = df[df['Year'] == sy]
-            if not dfy.empty:
-                # 1. คำนวณสรุปข้อมูล
-                sum_df = dfy.groupby('Employee').agg(
-                    Total=('Sub_Task','count'), 
-                    Avg=('Score','mean'), 
-                    Late=('Status', lambda x: x.str.contains('ล่าช้า').sum())
-                ).reset_index()
-                
-                sum_df['Avg'] = sum_df['Avg'].fillna(0)
-                sum_df['OnTime%'] = ((sum_df['Total'] - sum_df['Late']) / sum_df['Total']) * 100
-                
-                # -------------------------------------------------------
-                # [จุดที่แก้] เพิ่มตัวตัดสิน (Tie-Breaker)
-                # เรียงตาม: คะแนน (มาก) -> งาน (มาก) -> ตรงเวลา (มาก)
-                # -------------------------------------------------------
-                sum_df = sum_df.sort_values(by=['Avg', 'Total', 'OnTime%'], ascending=[False, False, False]).reset_index(drop=True)
-
-                # ตัวแปรช่วยเช็คอันดับร่วม (Joint Rank)
-                last_stats = None
-                current_rank = 0
-                display_rank = 0
-
-                for i, row in sum_df.iterrows():
-                    # เช็คค่าปัจจุบันเพื่อดูว่าซ้ำกับคนก่อนหน้าไหม
-                    current_stats = (row['Avg'], row['Total'], row['OnTime%'])
-                    
-                    if current_stats != last_stats:
-                        current_rank = i + 1 # ถ้าไม่ซ้ำ ให้นับลำดับตามแถวจริง
-                        display_rank = current_rank
-                    # ถ้าซ้ำ (else) ก็จะใช้ display_rank ตัวเดิม (ได้ที่ 1 ร่วม)
-
-                    last_stats = current_stats
-
-                    # กำหนดเหรียญ
-                    if display_rank == 1: medal = "🥇"
-                    elif display_rank == 2: medal = "🥈"
-                    elif display_rank == 3: medal = "🥉"
-                    else: medal = f"#{display_rank}"
+            sy = st.selectbox("ปีงบประมาณ", yrs)
+            board = lb.board(sy)
+            c_csv, c_xlsx = st.columns(2)
+            c_csv.download_button(f"⬇️ ปี {sy} (CSV)", lambda: bulk.to_csv(board), file_name=f"leaderboard_{sy}.csv",
+                                  mime="text/csv", use_container_width=True)
+            # ทุกปีในไฟล์เดียว (1 ชีตต่อปี) เขียนทีละปี
+            c_xlsx.download_button("⬇️ ทุกปี (Excel)", lambda: bulk.to_xlsx((str(y), lb.board(y)) for y in yrs),
+                                   file_name="leaderboard.xlsx", use_container_width=True)
+            if not board.empty:
+                # การ์ดเฉพาะ N อันดับแรก ที่เหลือแสดงเป็นตารางแบ่งหน้า
+                top = board.iloc[:LEADERBOARD_CARDS]
+                for row in top.to_dict('records'):
+                    rank = row['Rank']
+                    medal = {1: "🥇", 2: "🥈", 3: "🥉"}.get(rank, f"#{rank}")
 
                     with st.container(border=True):
                         c_medal, c_info, c_total, c_ontime = st.columns([1, 3, 2, 2])
@@ -461,6 +665,38 @@ with tab4:
                         c_total.metric("งานทั้งหมด", f"{row['Total']} งาน")
                         c_ontime.metric("ตรงเวลา", f"{row['OnTime%']:.0f}%")
 
+                rest = board.iloc[LEADERBOARD_CARDS:]
+                if not rest.empty:
+                    n_pages = -(-len(rest) // LEADERBOARD_PAGE_SIZE)
+                    page = st.selectbox("หน้าตารางผลงาน", range(1, n_pages + 1)) - 1 if n_pages > 1 else 0
+                    st.dataframe(
+                        rest.iloc[page * LEADERBOARD_PAGE_SIZE:(page + 1) * LEADERBOARD_PAGE_SIZE],
+                        use_container_width=True, hide_index=True,
+                        column_config={
+                            "Rank": st.column_config.NumberColumn("อันดับ"),
+                            "Employee": st.column_config.TextColumn(THAI_COLS["Employee"]),
+                            "Total": st.column_config.NumberColumn(THAI_COLS["Total"]),
+                            "Avg": st.column_config.NumberColumn(THAI_COLS["Avg"], format="%.1f"),
+                            "Late": st.column_config.NumberColumn(THAI_COLS["Late"]),
+                            "OnTime%": st.column_config.NumberColumn(THAI_COLS["OnTime%"], format="%.0f%%")
+                        }
+                    )
+
             else: st.info("ไม่มีงานปีนี้")
+            if sy in set(archive['Year']): archived_tasks(sy)
         else: st.info("ไม่มีข้อมูลปี")
-    else: st.info("ไม่มีข้อมูล")
\ No newline at end of file
+    else: st.info("ไม่มีข้อมูล")
+
+VIEWS = {"📝 ลงทะเบียน": ('form', view_form), "📊 แผนผัง": ('timeline', view_timeline),
+         "🛠️ อัพเดต": ('update', view_update), "🏆 ผลงาน": ('leaderboard', view_leaderboard)}
+if 'k_view' not in st.session_state:
+    # ลิงก์ตรงไปหน้าที่ต้องการได้ด้วย ?view=timeline
+    st.session_state['k_view'] = next((v for v, (name, _) in VIEWS.items() if name == st.query_params.get('view')), list(VIEWS)[0])
+view = st.radio("หน้า", list(VIEWS), horizontal=True, key="k_view", label_visibility="collapsed")
+view_name, render_view = VIEWS[view]
+if st.query_params.get('view') != view_name: st.query_params['view'] = view_name
+with run.phase(view_name): render_view()
+run.mark('first_paint')
+
+st.session_state['last_run'] = {**run.phases, **{f"⏱ {k}": v for k, v in run.marks.items()}}
+run.finish(data_version=get_store().snap.version if get_store().snap else None)
\ No newline at end of file
@@ -0,0 +1 @@
+"""Benchmark แบบ offline ของ Project Tracker (ดู bench/run.py)"""
@@ -0,0 +1,111 @@
+"""Spreadsheet / Worksheet จำลองสำหรับ benchmark (ไม่ต่อ network)
+
+รองรับเฉพาะ method ของ gspread ที่ storage.py เรียก ค่าเก็บเป็น string แบบที่ Sheets API คืนมา
+และนับจำนวน API call กับขนาด payload (JSON) ที่รับส่ง
+"""
+import json
+from collections import Counter
+from datetime import datetime, timezone
+
+import gspread
+
+def _cell(v):
+    # Sheets คืนค่าแบบ formatted string: 100.0 -> "100"
+    if isinstance(v, float) and v.is_integer(): return str(int(v))
+    return '' if v is None else str(v)
+
+def _size(obj):
+    return len(json.dumps(obj, ensure_ascii=False, default=str).encode('utf-8'))
+
+class FakeWorksheet:
+    def __init__(self, sh, title, rows, sheet_id):
+        self.sh, self.title, self.id = sh, title, sheet_id
+        self.rows = [[_cell(v) for v in r] for r in rows]
+        self.grid = max(len(self.rows), 1)  # จำนวนแถวของ grid: updateCells เขียนเกินนี้ไม่ได้ (เหมือน Sheets)
+
+    def append_rows(self, rows, value_input_option=None, **kwargs):
+        self.sh._call('append_rows', sent={'values': rows})
+        self.rows += [[_cell(v) for v in r] for r in rows]
+        self.grid = max(self.grid, len(self.rows))
+        self.sh._touch()
+
+    def append_row(self, row, value_input_option=None, **kwargs):
+        self.append_rows([row], value_input_option)
+
+    def get_all_values(self):
+        return self.sh._call('get_all_values', received=[list(r) for r in self.rows])
+
+class FakeSpreadsheet:
+    def __init__(self, tables):
+        self.ws = {name: FakeWorksheet(self, name, rows, i) for i, (name, rows) in enumerate(tables.items())}
+        self.modified = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.calls = Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def _call(self, name, sent=None, received=None):
+        self.calls[name] += 1
+        if sent is not None: self.bytes_sent += _size(sent)
+        if received is not None: self.bytes_received += _size(received)
+        return received
+
+    def _touch(self): self.modified += 1
+
+    def worksheets(self):
+        self._call('worksheets')
+        return list(self.ws.values())
+
+    def worksheet(self, title):
+        self._call('worksheet')
+        if title not in self.ws: raise gspread.exceptions.WorksheetNotFound(title)
+        return self.ws[title]
+
+    def add_worksheet(self, title, rows=1, cols=1):
+        self._call('add_worksheet')
+        self.ws[title] = FakeWorksheet(self, title, [], len(self.ws))
+        return self.ws[title]
+
+    def get_lastUpdateTime(self):
+        self._call('get_lastUpdateTime')
+        return datetime.fromtimestamp(self.modified, timezone.utc).isoformat().replace('+00:00', 'Z')
+
+    def values_batch_get(self, ranges, params=None):
+        out = [{'range': r, 'values': [list(row) for row in self.ws[r.strip("'")].rows]} for r in ranges]
+        return self._call('values_batch_get', sent={'ranges': ranges}, received={'valueRanges': out})
+
+    def batch_update(self, body):
+        self._call('batch_update', sent=body)
+        by_id = {w.id: w for w in self.ws.values()}
+        value = lambda c: _cell(next(iter(c['userEnteredValue'].values())))
+        before = {w: (list(w.rows), w.grid) for w in self.ws.values()}
+        try: self._apply(body['requests'], by_id, value)
+        except Exception:
+            for w, (rows, grid) in before.items(): w.rows, w.grid = rows, grid  # batch_update ทั้งชุดหรือไม่เลย
+            raise
+        self._touch()
+        return {}
+
+    def _apply(self, requests, by_id, value):
+        for req in requests:
+            (kind, arg), = req.items()
+            if kind == 'deleteDimension':
+                r = arg['range']
+                ws = by_id[r['sheetId']]
+                del ws.rows[r['startIndex']:r['endIndex']]
+                ws.grid -= min(r['endIndex'], ws.grid) - r['startIndex']
+            elif kind == 'appendCells':
+                ws = by_id[arg['sheetId']]
+                ws.rows += [[value(c) for c in row['values']] for row in arg['rows']]
+                ws.grid = max(ws.grid, len(ws.rows))
+            elif kind == 'updateCells' and 'range' in arg:
+                by_id[arg['range']['sheetId']].rows = []  # ล้างค่า grid เท่าเดิม
+            elif kind == 'updateCells':
+                ws, i = by_id[arg['start']['sheetId']], arg['start']['rowIndex']
+                if i + len(arg['rows']) > ws.grid: raise ValueError(f"updateCells เกินขอบ grid ({ws.grid} แถว)")
+                for row in arg['rows']:
+                    while len(ws.rows) <= i: ws.rows.append([])
+                    ws.rows[i] = [value(c) for c in row['values']]
+                    i += 1
@@ -0,0 +1,284 @@
+"""Benchmark ของ hot path หลัก ด้วยข้อมูลสังเคราะห์และ Google Sheets จำลอง (ไม่ต่อ network)
+
+    python -m bench.run                          # 1k / 10k / 100k แถว เทียบกับ bench/baseline.json
+    python -m bench.run --sizes 1000 --repeat 5
+    python -m bench.run --save-baseline          # บันทึกผลรอบนี้เป็น baseline ใหม่
+
+รายงานเวลา (ดีที่สุดจาก --repeat รอบ), หน่วยความจำสูงสุด (tracemalloc) และจำนวน API call
+ถ้าช้าลง / ใช้หน่วยความจำมากขึ้นเกิน --tolerance หรือเรียก API มากขึ้น จะจบด้วย exit code 1
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+import bulk
+import reports
+import scoring
+import storage
+from bench.fake_sheets import FakeSpreadsheet
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SIZES = [1_000, 10_000, 100_000]
+NOISE_MS = 5  # ต่างกันน้อยกว่านี้ไม่นับว่าช้าลง
+
+# ==========================================
+# 1. SYNTHETIC DATA
+# ==========================================
+def make_tables(n, seed=0):
+    """ตาราง Logs / Employees / Projects / LogBook แบบที่อยู่บนชีต ขนาด n งาน"""
+    rng = np.random.default_rng(seed)
+    emps = [f"พนักงาน {i:03d}" for i in range(max(5, n // 200))]
+    projs = [f"โปรเจกต์ {i:03d}" for i in range(max(3, n // 100))]
+    today = date.today()
+
+    emp = rng.integers(0, len(emps), n)
+    proj = rng.integers(0, len(projs), n)
+    start = pd.Timestamp(today) - pd.to_timedelta(rng.integers(-60, 3 * 365, n), 'D')
+    end = start + pd.to_timedelta(rng.integers(0, 60, n), 'D')
+    start_s = np.asarray(start.strftime('%Y-%m-%d'), dtype=object)
+    end_s = np.asarray(end.strftime('%Y-%m-%d'), dtype=object)
+    start_s[rng.random(n) < 0.03] = ''                  # วันที่ไม่ครบ
+    end_s[rng.random(n) < 0.03] = ''
+    end_s[rng.random(n) < 0.002] = '31/02/2024'         # รูปแบบผิด -> Error
+    progress = np.where(rng.random(n) < 0.3, 100, rng.integers(0, 100, n))
+    status = rng.choice(scoring.STATUSES[:4], n)
+
+    # งานต่อเนื่อง: ~40% รองานก่อนหน้าในโปรเจกต์เดียวกัน
+    last_sub, deps = {}, []
+    for i in range(n):
+        p = proj[i]
+        deps.append(last_sub[p] if p in last_sub and rng.random() < 0.4 else "- เริ่มใหม่ -")
+        last_sub[p] = f"งาน {i:06d}"
+
+    # Log Book: งานส่วนใหญ่มีไม่กี่บันทึก บางงานยาวมาก
+    counts = np.where(rng.random(n) < 0.05, rng.integers(20, 120, n), rng.integers(0, 4, n))
+    entry = "ประชุมทีม ติดตามงาน แก้ไขตาม feedback และอัปเดตเอกสารประกอบ"
+    logbook = [storage.LOGBOOK_COLS]
+    logs = [storage.LOG_COLS]
+    for i in range(n):
+        key = [emps[emp[i]], projs[proj[i]], f"งาน {i:06d}"]
+        for k in range(counts[i]): logbook.append(key + [f"2025-01-{k % 28 + 1:02d} 09:00", f"{entry} #{k}"])
+        latest = f"{entry} #{counts[i] - 1}" if counts[i] else ''
+        logs.append(key[:2] + [key[2], start_s[i], end_s[i], f"https://example.com/doc/{i}", latest, int(counts[i]),
+                               deps[i], int(progress[i]), 0, status[i]])
+
+    return {'Logs': logs, 'Employees': [['Name']] + [[e] for e in emps],
+            'Projects': [['Project']] + [[p] for p in projs], storage.LOGBOOK: logbook}
+
+class Context:
+    """ข้อมูลของขนาดหนึ่ง ๆ ที่ทุก case ใช้ร่วมกัน (สร้างครั้งเดียว)"""
+
+    def __init__(self, n):
+        self.n = n
+        self.tables = make_tables(n)
+        self.df, self.emps, self.projs, self.synced = storage.load_data(FakeSpreadsheet(self.tables))
+        self.df['_rid'] = np.arange(len(self.df))
+        self.prepared = scoring.calculate_status_and_score(self.df.copy())
+
+    def sheet(self): return FakeSpreadsheet(self.tables)
+
+    def saved_sheet(self):
+        # Logs แบบที่แอปเขียนไว้แล้ว (มี Row_ID, สถานะ/คะแนนคำนวณแล้ว): case ที่ใช้ DataStore
+        # จะได้ไม่นับการเขียนทุกแถวครั้งแรก (เติม Row_ID / สถานะของข้อมูลสังเคราะห์) รวมไปด้วย
+        df = self.prepared.copy()
+        storage.assign_row_ids(df)
+        return FakeSpreadsheet({**self.tables, 'Logs': [storage.LOG_COLS] + storage._to_sheet_rows(df)})
+
+    def store(self, sh):
+        return storage.DataStore(storage.SheetsBackend(lambda: sh), prepare=scoring.calculate_status_and_score,
+                                 summarize=reports.year_sums)
+
+    def archived_sheet(self):
+        # ชีตหลังย้ายงานที่เสร็จแล้วของปีที่ปิดไป archive (สร้างครั้งเดียวต่อขนาด)
+        if not hasattr(self, '_archived'):
+            sh = self.saved_sheet()
+            store = self.store(sh)
+            store.snapshot()
+            store.flush()
+            self._archived = {name: ws.rows for name, ws in sh.ws.items()}
+        return FakeSpreadsheet(self._archived)
+
+# ==========================================
+# 2. CASES: setup(ctx) -> (sheet หรือ None, ฟังก์ชันที่จับเวลา)
+# ==========================================
+CASES = {}
+
+def case(name):
+    def deco(fn):
+        CASES[name] = fn
+        return fn
+    return deco
+
+@case('load_data')
+def _load(ctx):
+    sh = ctx.sheet()
+    return sh, lambda: storage.load_data(sh)
+
+@case('save_data_full')
+def _save_full(ctx):
+    sh = ctx.sheet()
+    return sh, lambda: storage.save_data(sh, ctx.df, ctx.emps, ctx.projs, {}, [None] * len(ctx.df))
+
+@case('save_data_edit')
+def _save_edit(ctx):
+    # แก้งานเดียว + เพิ่มงานใหม่หนึ่งแถว -> ควรเป็น batch_update เดียวขนาดเล็ก
+    sh = ctx.sheet()
+    df = ctx.df.copy()
+    df.loc[len(df) // 2, 'Progress'] = 55
+    df = pd.concat([df, df.iloc[[0]]], ignore_index=True)
+    pos = list(range(len(ctx.df))) + [None]
+    return sh, lambda: storage.save_data(sh, df, ctx.emps, ctx.projs, ctx.synced, pos)
+
+@case('append_log')
+def _append_log(ctx):
+    sh = ctx.sheet()
+    backend = storage.SheetsBackend(lambda: sh)
+    rows = [['พนักงาน 000', 'โปรเจกต์ 000', 'งาน 000000', '2025-02-01 10:00', 'บันทึกใหม่']]
+    return sh, lambda: backend.append_log(rows)
+
+@case('status_and_score')
+def _status(ctx):
+    df = ctx.df.copy()
+    return None, lambda: scoring.calculate_status_and_score(df)
+
+@case('timeline')
+def _timeline(ctx):
+    today = date.today()
+    start, end = today - timedelta(days=90), today + timedelta(days=90)
+    def run():
+        rows = reports.timeline_rows(ctx.prepared, 'Sub_Task', start, end)
+        reports.timeline_figure(rows.iloc[:reports.GANTT_PAGE_SIZE], start, end, today)
+        reports.timeline_rows(ctx.prepared, 'Main_Task', start, end)
+    return None, run
+
+@case('leaderboard')
+def _leaderboard(ctx):
+    def run():
+        lb = reports.Leaderboard()
+        lb.sync(ctx.prepared)
+        for y in lb.years(): lb.board(y)
+    return None, run
+
+@case('leaderboard_edit')
+def _leaderboard_edit(ctx):
+    lb = reports.Leaderboard()
+    lb.sync(ctx.prepared)
+    for y in lb.years(): lb.board(y)
+    df = ctx.prepared.copy()
+    df.loc[0, 'Score'] = 0 if df.loc[0, 'Score'] else 100
+    def run():
+        lb.sync(df)
+        for y in lb.years(): lb.board(y)
+    return None, run
+
+@case('bulk_import')
+def _bulk_import(ctx):
+    # ไฟล์ CSV ทุกงาน -> ตรวจ + คำนวณทีละชุด แล้ว commit ก้อนเดียว (ไม่ต่อ backend)
+    data = bulk.to_csv(ctx.df, bulk.REQUIRED_COLS + bulk.OPTIONAL_COLS)
+    def run():
+        bulk.import_tasks(io.BytesIO(data), 'tasks.csv', ctx.emps, ctx.projs, commit=lambda ops: None,
+                          new_ids=lambda k: np.arange(k))
+    return None, run
+
+@case('export_xlsx')
+def _export_xlsx(ctx):
+    return None, lambda: bulk.to_xlsx([('Tasks', ctx.prepared[bulk.TASK_EXPORT_COLS])])
+
+@case('archive_move')
+def _archive_move(ctx):
+    # ย้ายงานของปีที่ปิดแล้วทั้งหมด: อ่าน/เขียน partition ต่อปี + ลบแถวออกจาก Logs
+    sh = ctx.saved_sheet()
+    store = ctx.store(sh)
+    store.snapshot()
+    return sh, store.flush
+
+@case('load_working_set')
+def _load_working_set(ctx):
+    # โหลด Logs หลังย้ายงานไป archive แล้ว (เทียบกับ load_data ที่โหลดทุกปี)
+    sh = ctx.archived_sheet()
+    return sh, lambda: storage.load_data(sh)
+
+# ==========================================
+# 3. RUNNER
+# ==========================================
+def measure(ctx, name, repeat):
+    setup = CASES[name]
+    best, calls, sent, received = None, 0, 0, 0
+    for _ in range(repeat):
+        sh, fn = setup(ctx)
+        if sh: sh.reset_counters()
+        t0 = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - t0) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+        if sh: calls, sent, received = sum(sh.calls.values()), sh.bytes_sent, sh.bytes_received
+
+    # วัดหน่วยความจำแยกรอบ (tracemalloc ทำให้ช้าลง ไม่ปนกับเวลา)
+    sh, fn = setup(ctx)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'ms': round(best, 2), 'peak_mb': round(peak / 2 ** 20, 2), 'api_calls': calls,
+            'kb_sent': round(sent / 1024, 1), 'kb_received': round(received / 1024, 1)}
+
+def compare(results, baseline, tolerance):
+    problems = []
+    for key, r in results.items():
+        b = baseline.get(key)
+        if not b: continue
+        if r['ms'] > b['ms'] * (1 + tolerance) and r['ms'] - b['ms'] > NOISE_MS:
+            problems.append(f"{key}: เวลา {b['ms']} -> {r['ms']} ms")
+        if r['peak_mb'] > b['peak_mb'] * (1 + tolerance) and r['peak_mb'] - b['peak_mb'] > 1:
+            problems.append(f"{key}: หน่วยความจำ {b['peak_mb']} -> {r['peak_mb']} MB")
+        if r['api_calls'] > b['api_calls']:
+            problems.append(f"{key}: API call {b['api_calls']} -> {r['api_calls']}")
+    return problems
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    ap.add_argument('--repeat', type=int, default=3)
+    ap.add_argument('--only', nargs='+', choices=list(CASES), help="รันเฉพาะ case ที่ระบุ")
+    ap.add_argument('--baseline', default=BASELINE)
+    ap.add_argument('--save-baseline', action='store_true')
+    ap.add_argument('--tolerance', type=float, default=0.5, help="สัดส่วนที่ยอมให้แย่ลงได้ (0.5 = 50%%)")
+    ap.add_argument('--json', help="เขียนผลลัพธ์เป็นไฟล์ JSON")
+    args = ap.parse_args(argv)
+
+    results = {}
+    print(f"{'case':<22}{'rows':>8}{'ms':>12}{'peak MB':>10}{'calls':>7}{'KB sent':>11}{'KB recv':>11}")
+    for n in args.sizes:
+        ctx = Context(n)
+        for name in args.only or CASES:
+            r = results[f"{name}@{n}"] = measure(ctx, name, args.repeat)
+            print(f"{name:<22}{n:>8}{r['ms']:>12.2f}{r['peak_mb']:>10.2f}{r['api_calls']:>7}{r['kb_sent']:>11.1f}{r['kb_received']:>11.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f: json.dump(results, f, indent=2)
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f: baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w', encoding='utf-8') as f: json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"บันทึก baseline แล้ว: {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("ยังไม่มี baseline (รันด้วย --save-baseline)")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f: problems = compare(results, json.load(f), args.tolerance)
+    for p in problems: print(f"REGRESSION {p}")
+    print("ไม่พบการถดถอยเทียบกับ baseline" if not problems else f"พบการถดถอย {len(problems)} รายการ")
+    return 1 if problems else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
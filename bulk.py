@@ -0,0 +1,171 @@
+"""นำเข้า / ส่งออกงานของ Project Tracker ทีละชุด (ไม่พึ่ง Streamlit)
+
+นำเข้า: อ่าน .xlsx / .csv ทีละ CHUNK_ROWS แถว ตรวจกับ schema ของ Logs คำนวณสถานะ/คะแนนทีละชุด
+ครบทั้งไฟล์แล้วจึง commit เป็น op 'add' ก้อนใหญ่ไม่กี่ครั้ง (writer เขียนลง backend เป็น batch เดียวต่อรอบ)
+ส่งออก: เขียนไฟล์ทีละชุด (xlsx แบบ write-only) ไม่สร้าง workbook / string ทั้งก้อนใน memory
+"""
+import io
+from collections import Counter, namedtuple
+from datetime import date, datetime
+
+import pandas as pd
+
+import metrics
+import scoring
+import storage
+
+CHUNK_ROWS = 5000     # แถวต่อชุดตอนอ่าน / ตรวจ / เขียนไฟล์
+COMMIT_ROWS = 50000   # แถวที่ผ่านการตรวจต่อการ commit หนึ่งครั้ง
+MAX_ERRORS = 200      # เก็บรายละเอียดแถวที่ไม่ผ่านไว้แสดงอย่างมากเท่านี้
+
+# ==========================================
+# 1. IMPORT
+# ==========================================
+REQUIRED_COLS = ['Employee', 'Main_Task', 'Sub_Task', 'Start_Date', 'End_Date']
+OPTIONAL_COLS = ['Output', 'Dependency', 'Progress']
+NEW_TASK = "- เริ่มใหม่ -"
+
+ImportResult = namedtuple('ImportResult', 'rows added errors statuses')  # errors = [(แถวในไฟล์, ข้อความ), ...]
+
+def _text(v):
+    # ค่าจาก openpyxl: วันที่ -> YYYY-MM-DD, 5.0 -> "5", None -> ""
+    if v is None: return ''
+    if isinstance(v, (datetime, date)): return v.strftime('%Y-%m-%d')
+    if isinstance(v, float) and v.is_integer(): return str(int(v))
+    return str(v).strip()
+
+def read_chunks(file, name, chunk=CHUNK_ROWS):
+    """แถวของไฟล์เป็น DataFrame ทีละชุด (ค่าเป็น string, index = เลขแถวในไฟล์ หัวตาราง = แถว 1)"""
+    if name.lower().endswith('.csv'):
+        for df in pd.read_csv(file, dtype=str, keep_default_na=False, chunksize=chunk, encoding='utf-8-sig'):
+            df.columns = [str(c).strip() for c in df.columns]
+            yield df.set_axis(df.index + 2)
+        return
+
+    # import ตอนใช้: ผู้ใช้ส่วนใหญ่ไม่ได้นำเข้าไฟล์
+    import openpyxl
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = [_text(h) for h in next(rows, ())]
+        buf, at = [], []
+        for i, row in enumerate(rows, start=2):
+            row = [_text(v) for v in row[:len(header)]]
+            if not any(row): continue
+            buf.append(row)
+            at.append(i)
+            if len(buf) == chunk:
+                yield pd.DataFrame(buf, columns=header, index=at)
+                buf, at = [], []
+        if buf: yield pd.DataFrame(buf, columns=header, index=at)
+    finally: wb.close()
+
+def validate(chunk, employees, projects):
+    """ตรวจหนึ่งชุด คืน (DataFrame ตาม schema ของ Logs เฉพาะแถวที่ผ่าน, [(แถวในไฟล์, ข้อความ), ...])
+
+    employees / projects = set ของชื่อที่มีในระบบ; แต่ละแถวรายงานเฉพาะปัญหาแรกที่เจอ
+    """
+    c = chunk.reindex(columns=REQUIRED_COLS + OPTIONAL_COLS, fill_value='').fillna('').astype(str)
+    c = c.apply(lambda col: col.str.strip())
+    start = pd.to_datetime(c['Start_Date'], format='ISO8601', errors='coerce')
+    end = pd.to_datetime(c['End_Date'], format='ISO8601', errors='coerce')
+    prog = pd.to_numeric(c['Progress'].replace('', '0'), errors='coerce')
+
+    problem = pd.Series('', index=c.index)
+    for mask, msg in [
+        (c['Sub_Task'] == '', "ไม่มีชื่องาน"),
+        (~c['Employee'].isin(employees), "ไม่รู้จักพนักงาน"),
+        (~c['Main_Task'].isin(projects), "ไม่รู้จักโปรเจกต์"),
+        (start.isna(), "วันเริ่มไม่ถูกต้อง (YYYY-MM-DD)"),
+        (end.isna(), "กำหนดส่งไม่ถูกต้อง (YYYY-MM-DD)"),
+        (start > end, "วันเริ่มอยู่หลังกำหนดส่ง"),
+        (prog.isna() | (prog < 0) | (prog > 100), "ความคืบหน้าต้องเป็น 0-100"),
+    ]:
+        problem[mask & (problem == '')] = msg
+
+    ok = (problem == '').to_numpy()
+    bad = problem[~ok]
+    good = c[ok].assign(Start_Date=start[ok], End_Date=end[ok], Progress=prog[ok],
+                        Dependency=c['Dependency'][ok].replace('', NEW_TASK))
+    return storage.coerce_logs(good.reset_index(drop=True)), list(zip(bad.index.tolist(), bad.tolist()))
+
+def import_tasks(file, name, employees, projects, commit, new_ids, progress=None, chunk=CHUNK_ROWS, batch=COMMIT_ROWS):
+    """นำเข้างานจากไฟล์: ตรวจ + คำนวณสถานะทีละชุดจนครบไฟล์ แล้ว commit(ops) ครั้งละ `batch` แถวที่ผ่าน
+
+    new_ids(n) -> _rid ของแถวใหม่, progress(แถวที่อ่านแล้ว) ถูกเรียกหลังตรวจแต่ละชุด
+    หัวตารางไม่ครบ / อ่านไฟล์ไม่ได้กลางทาง -> raise โดยยังไม่ commit อะไร (ลองใหม่ได้ ไม่ได้งานซ้ำ)
+    แถวที่ไม่ผ่านถูกข้ามและรายงานใน errors
+    """
+    employees, projects = {str(x) for x in employees}, {str(x) for x in projects}
+    rows = added = 0
+    errors, statuses, valid, pending = [], Counter(), [], []
+
+    def flush():
+        nonlocal added, pending
+        df = pd.concat(pending, ignore_index=True)
+        df['_rid'] = new_ids(len(df))
+        with metrics.timer('import', step='commit'): commit([('add', df)])
+        added += len(df)
+        pending = []
+
+    for raw in read_chunks(file, name, chunk):
+        if rows == 0:
+            missing = [col for col in REQUIRED_COLS if col not in raw.columns]
+            if missing: raise ValueError(f"ไม่มีคอลัมน์: {', '.join(missing)}")
+        with metrics.timer('import', step='chunk'):
+            good, bad = validate(raw, employees, projects)
+            good = scoring.calculate_status_and_score(good)
+        rows += len(raw)
+        errors += bad[:MAX_ERRORS - len(errors)]
+        statuses.update(good['Status'].astype(str).value_counts().to_dict())
+        metrics.inc('import_rows', len(good), result='ok')
+        metrics.inc('import_rows', len(bad), result='invalid')
+        if not good.empty: valid.append(good)
+        if progress: progress(rows)
+    # commit หลังตรวจครบไฟล์: ไฟล์เสียกลางทางจะไม่เหลืองานที่ถูกเพิ่มไปแล้วบางส่วน
+    for good in valid:
+        pending.append(good)
+        if sum(len(p) for p in pending) >= batch: flush()
+    if pending: flush()
+    return ImportResult(rows, added, errors, dict(statuses))
+
+# ==========================================
+# 2. EXPORT
+# ==========================================
+TASK_EXPORT_COLS = ['Employee', 'Main_Task', 'Sub_Task', 'Start_Date', 'End_Date', 'Progress', 'Status', 'Score',
+                    'Output', 'Dependency', 'Issue', 'Log_Count']
+
+def _plain(df):
+    # ค่าที่ csv / openpyxl เขียนได้ตรง ๆ: วันที่ -> date, category -> str, ค่าว่าง -> None
+    out = {}
+    for c in df.columns:
+        col = df[c]
+        if pd.api.types.is_datetime64_any_dtype(col): col = col.dt.date
+        elif isinstance(col.dtype, pd.CategoricalDtype): col = col.astype(str)
+        col = col.astype(object)
+        out[c] = col.where(col.notna(), None)
+    return pd.DataFrame(out, index=df.index)
+
+def to_csv(df, cols=None, chunk=CHUNK_ROWS):
+    """CSV (UTF-8 BOM ให้ Excel อ่านภาษาไทยได้) เขียนทีละชุด"""
+    df = df[cols] if cols else df
+    buf = io.BytesIO()
+    text = io.TextIOWrapper(buf, encoding='utf-8-sig', newline='')
+    for i in range(0, max(len(df), 1), chunk):
+        _plain(df.iloc[i:i + chunk]).to_csv(text, header=(i == 0), index=False)
+    text.flush()
+    text.detach()
+    return buf.getvalue()
+
+def to_xlsx(sheets, chunk=CHUNK_ROWS):
+    """xlsx จาก [(ชื่อชีต, DataFrame), ...] แบบ write-only: แถวถูกส่งต่อลงไฟล์ทีละชุด ไม่เก็บ cell ไว้ใน memory"""
+    from openpyxl import Workbook
+    wb = Workbook(write_only=True)
+    for title, df in sheets:
+        ws = wb.create_sheet(str(title)[:31])
+        ws.append([str(c) for c in df.columns])
+        for i in range(0, len(df), chunk):
+            for row in _plain(df.iloc[i:i + chunk]).itertuples(index=False, name=None): ws.append(row)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
@@ -0,0 +1,172 @@
+"""ตัววัดประสิทธิภาพของ Project Tracker (ใช้ร่วมกันทั้ง process, ไม่พึ่ง Streamlit)
+
+ทุกการบันทึกเป็นแค่การบวกตัวเลขใน dict ภายใต้ lock จึงเปิดไว้ใน production ได้
+ส่งออกเป็น Prometheus text (TRACKER_METRICS_FILE) และ JSON log ต่อรอบ rerun (TRACKER_METRICS_LOG)
+"""
+import itertools
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from urllib.parse import urlparse
+
+EXPORT_INTERVAL = 15  # วินาที: เขียนไฟล์ Prometheus อย่างมากทุก ๆ เท่านี้
+
+# ==========================================
+# 1. REGISTRY
+# ==========================================
+def _key(name, labels): return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(float)   # (ชื่อ, labels) -> ค่า
+        self.timings = {}                    # (ชื่อ, labels) -> [จำนวน, รวมวินาที, สูงสุด]
+        self.started = time.time()
+        self._exported_at = 0.0
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self.lock: self.counters[key] += value
+
+    def observe(self, name, seconds, **labels):
+        key = _key(name, labels)
+        with self.lock:
+            t = self.timings.get(key)
+            if t is None: self.timings[key] = [1, seconds, seconds]
+            else:
+                t[0] += 1
+                t[1] += seconds
+                t[2] = max(t[2], seconds)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        t0 = time.perf_counter()
+        try: yield
+        finally: self.observe(name, time.perf_counter() - t0, **labels)
+
+    def lookup(self, cache, hit):
+        """นับการเรียกแคช (hit ratio = 1 - misses / lookups)"""
+        self.inc('cache_lookups', cache=cache)
+        if not hit: self.inc('cache_misses', cache=cache)
+
+    def rows(self, name):
+        """ค่าของตัววัดหนึ่งตัวแยกตาม labels: [(dict labels, ค่า หรือ [จำนวน, รวม, สูงสุด]), ...]"""
+        with self.lock:
+            src = self.timings if name in {k[0] for k in self.timings} else self.counters
+            return [(dict(labels), list(v) if isinstance(v, list) else v) for (n, labels), v in src.items() if n == name]
+
+    def prometheus(self):
+        def fmt(name, labels, suffix=''):
+            inner = ','.join(f'{k}="{_escape(v)}"' for k, v in labels)
+            return f"tracker_{name}{suffix}{{{inner}}}" if inner else f"tracker_{name}{suffix}"
+
+        with self.lock:
+            counters, timings = dict(self.counters), {k: list(v) for k, v in self.timings.items()}
+        lines = [f"tracker_uptime_seconds {time.time() - self.started:.3f}"]
+        for name in sorted({k[0] for k in counters}):
+            lines.append(f"# TYPE tracker_{name}_total counter")
+            lines += [f"{fmt(name, labels, '_total')} {v:g}" for (n, labels), v in sorted(counters.items()) if n == name]
+        for name in sorted({k[0] for k in timings}):
+            lines.append(f"# TYPE tracker_{name}_seconds summary")
+            for (n, labels), (count, total, peak) in sorted(timings.items()):
+                if n != name: continue
+                lines.append(f"{fmt(name, labels, '_seconds_count')} {count}")
+                lines.append(f"{fmt(name, labels, '_seconds_sum')} {total:.6f}")
+                lines.append(f"{fmt(name, labels, '_seconds_max')} {peak:.6f}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, force=False):
+        """เขียน Prometheus text ลง TRACKER_METRICS_FILE (ถ้าตั้งไว้) แบบ atomic"""
+        path = os.environ.get("TRACKER_METRICS_FILE")
+        now = time.monotonic()
+        if not path or (not force and now - self._exported_at < EXPORT_INTERVAL): return
+        self._exported_at = now
+        try:
+            with open(path + '.tmp', 'w', encoding='utf-8') as f: f.write(self.prometheus())
+            os.replace(path + '.tmp', path)
+        except OSError as e: print(f"Metrics Error: {e}")
+
+def _escape(v): return v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+REGISTRY = Registry()
+inc, observe, timer, lookup = REGISTRY.inc, REGISTRY.observe, REGISTRY.timer, REGISTRY.lookup
+
+def log_event(event, **fields):
+    """เขียน JSON หนึ่งบรรทัดลง TRACKER_METRICS_LOG (ถ้าตั้งไว้)"""
+    path = os.environ.get("TRACKER_METRICS_LOG")
+    if not path: return
+    try:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'ts': round(time.time(), 3), 'event': event, **fields}, ensure_ascii=False) + '\n')
+    except OSError as e: print(f"Metrics Error: {e}")
+
+# ==========================================
+# 2. PER-RERUN PHASES
+# ==========================================
+_runs = itertools.count()
+
+class Run:
+    """จับเวลาแต่ละช่วงของการรัน script หนึ่งรอบ
+
+    phase = เวลาของแต่ละช่วง, mark = เวลาตั้งแต่เริ่ม script ถึงจุดนั้น (เช่น first_paint)
+    รอบแรกของ process (cold) แยก label จากรอบถัด ๆ ไป (warm)
+    """
+
+    def __init__(self, t0=None):
+        self.t0 = time.perf_counter() if t0 is None else t0
+        self.start = 'cold' if next(_runs) == 0 else 'warm'
+        self.phases = {}
+        self.marks = {}
+
+    @contextmanager
+    def phase(self, name):
+        t0 = time.perf_counter()
+        try: yield
+        finally:
+            dt = time.perf_counter() - t0
+            self.phases[name] = self.phases.get(name, 0) + dt
+            observe('phase', dt, phase=name)
+
+    def mark(self, name):
+        dt = time.perf_counter() - self.t0
+        self.marks[name] = dt
+        observe(name, dt, start=self.start)
+
+    def finish(self, **fields):
+        total = time.perf_counter() - self.t0
+        observe('rerun', total, start=self.start)
+        log_event('rerun', start=self.start, total_ms=round(total * 1000, 1),
+                  phases={k: round(v * 1000, 1) for k, v in self.phases.items()},
+                  marks={k: round(v * 1000, 1) for k, v in self.marks.items()}, **fields)
+        REGISTRY.export()
+        return total
+
+# ==========================================
+# 3. GOOGLE API (ผ่าน hook ของ requests)
+# ==========================================
+def api_name(url):
+    """ชื่อ endpoint แบบย่อจาก URL ของ Google API (ไม่รวม id ของไฟล์)"""
+    u = urlparse(url)
+    path = u.path
+    if 'oauth2' in u.netloc or path.endswith('/token'): return 'oauth.token'
+    if 'drive' in u.netloc or path.startswith('/drive/'): return 'drive.files'
+    for suffix, name in ((':batchUpdate', 'batchUpdate'), (':batchGet', 'values.batchGet'), (':append', 'values.append')):
+        if path.endswith(suffix): return name
+    if '/values/' in path: return 'values.get'
+    return 'spreadsheets.get'
+
+def instrument_session(session):
+    """นับทุก request ที่ gspread ส่ง: จำนวน (แยก status), bytes ไป/กลับ และ latency"""
+    def on_response(resp, *args, **kwargs):
+        api = api_name(resp.url)
+        body = resp.request.body or b''
+        received = resp.headers.get('Content-Length')
+        inc('sheets_api_calls', api=api, status=f"{resp.status_code // 100}xx")
+        inc('sheets_api_bytes_sent', len(body), api=api)
+        inc('sheets_api_bytes_received', int(received) if received else len(resp.content), api=api)
+        observe('sheets_api_latency', resp.elapsed.total_seconds(), api=api)
+    session.hooks['response'].append(on_response)
+    return session
@@ -0,0 +1,202 @@
+"""รายงานของ Project Tracker: แผนผัง timeline (หน้าแผนผัง) และตารางผลงาน (หน้าผลงาน)
+
+ฟังก์ชันในไฟล์นี้ไม่พึ่ง Streamlit (การแคชทำที่ app2.py) จึงเรียกจาก script / benchmark ได้
+"""
+import threading
+import numpy as np
+import pandas as pd
+
+import metrics
+
+# ==========================================
+# 1. TIMELINE (GANTT)
+# ==========================================
+GANTT_GROUPS = {'Sub_Task': 'รายงาน', 'Main_Task': 'รายโปรเจกต์', 'Employee': 'รายพนักงาน'}
+GANTT_PAGE_SIZE = 40
+LATE_MARK = 'ล่าช้า'
+
+def _is_late(status):
+    # categorical: .str ทำงานบน categories ไม่กี่ค่าแทนทุกแถว
+    return status.str.contains(LATE_MARK, regex=False, na=False).to_numpy(dtype=bool)
+
+def timeline_rows(df, group_by, start, end):
+    """แถวของ timeline ที่ทับช่วงวันที่ [start, end]
+
+    group_by='Sub_Task' -> 1 แท่งต่อ 1 งาน, 'Main_Task' / 'Employee' -> ยุบเป็น 1 แท่งต่อกลุ่ม
+    (เริ่ม = วันเริ่มแรกสุด, จบ = วันจบช้าสุด, ความคืบหน้า = ค่าเฉลี่ย)
+    """
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    df = df.dropna(subset=['Start_Date', 'End_Date'])
+    df = df[(df['Start_Date'] <= end) & (df['End_Date'] >= start)]
+
+    if group_by == 'Sub_Task':
+        rows = pd.DataFrame({
+            'Label': df['Sub_Task'].astype(str) + ' · ' + df['Employee'].astype(str),
+            'Color': df['Employee'].astype(str),
+            'Start': df['Start_Date'], 'End': df['End_Date'],
+            'Progress': df['Progress'].astype('float32'), 'Tasks': 1, 'Late': _is_late(df['Status']),
+            'Sub_Task': df['Sub_Task'], 'Employee': df['Employee'], 'Status': df['Status'], 'End_Date': df['End_Date'],
+        })
+    else:
+        g = df.assign(_late=_is_late(df['Status'])).groupby(group_by, observed=True)
+        rows = g.agg(Start=('Start_Date', 'min'), End=('End_Date', 'max'), Progress=('Progress', 'mean'),
+                     Tasks=('Sub_Task', 'size'), Late=('_late', 'any')).reset_index()
+        rows['Label'] = rows[group_by].astype(str)
+        rows['Color'] = rows['Label']
+    return rows.sort_values(['Start', 'Label'], kind='stable').reset_index(drop=True)
+
+def timeline_figure(rows, start, end, today):
+    """วาด timeline ด้วย Scattergl: แต่ละสีเป็น trace เดียว (เส้นหนาแทนแท่ง คั่นด้วย None)
+
+    WebGL วาดได้หลายพันแถวโดยไม่สร้าง SVG ทีละแท่งแบบ px.timeline
+    """
+    # import plotly เฉพาะตอนวาดกราฟครั้งแรก (ผู้ใช้ที่ไม่เปิดหน้าแผนผังไม่ต้องโหลด)
+    import plotly.graph_objects as go
+    from plotly.colors import qualitative
+
+    start, end = pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(days=1)
+    labels = rows['Label'].drop_duplicates().tolist()
+    fig = go.Figure()
+    palette = qualitative.Bold
+
+    for i, (name, grp) in enumerate(rows.groupby('Color', sort=False)):
+        s = grp['Start'].clip(lower=start).to_numpy()
+        e = (grp['End'] + pd.Timedelta(days=1)).clip(upper=end).to_numpy()
+        n = len(grp)
+        xs = np.empty(n * 3, dtype=object)
+        ys = np.empty(n * 3, dtype=object)
+        tips = np.empty(n * 3, dtype=object)
+        xs[0::3], xs[1::3], xs[2::3] = s, e, None
+        ys[0::3] = ys[1::3] = grp['Label'].to_numpy()
+        ys[2::3] = None
+        tip = (grp['Label'] + '<br>' + grp['Start'].dt.strftime('%d/%m/%Y') + ' - ' + grp['End'].dt.strftime('%d/%m/%Y')
+               + '<br>' + grp['Progress'].round().astype(int).astype(str) + '%').to_numpy()
+        tips[0::3] = tips[1::3] = tip
+        tips[2::3] = None
+        color = palette[i % len(palette)]
+        fig.add_trace(go.Scattergl(x=xs, y=ys, mode='lines', name=name, line=dict(width=14, color=color),
+                                   opacity=0.9, text=tips, hoverinfo='text'))
+
+    # ป้ายความคืบหน้ากลางแท่ง: trace เดียวทั้งกราฟ
+    mid = rows['Start'].clip(lower=start) + (rows['End'].clip(upper=end) - rows['Start'].clip(lower=start)) / 2
+    fig.add_trace(go.Scattergl(x=mid, y=rows['Label'], mode='text', showlegend=False, hoverinfo='skip',
+                               text=rows['Progress'].round().astype(int).astype(str) + '%', textfont=dict(size=10)))
+
+    fig.add_shape(type='line', x0=today, x1=today, y0=0, y1=1, yref='paper', line=dict(dash='dash', color='red'))
+    fig.update_yaxes(autorange="reversed", title="", type='category', categoryorder='array', categoryarray=labels)
+    fig.update_xaxes(type='date', range=[start, end])
+    fig.update_layout(
+        height=120 + len(labels) * 28,
+        margin=dict(l=10, r=10, t=10, b=10),
+        legend=dict(orientation="h", y=-0.2),
+    )
+    return fig
+
+# ==========================================
+# 2. LEADERBOARD
+# ==========================================
+RANK_COLS = ['Avg', 'Total', 'OnTime%']     # ลำดับตัวตัดสิน: คะแนน -> จำนวนงาน -> ตรงเวลา
+_SUMS = ['Total', 'ScoreSum', 'ScoreN', 'Late']
+
+def fiscal_year(end_dates):
+    """ปีงบประมาณของงาน = ปีของวันกำหนดส่ง"""
+    return end_dates.dt.year
+
+def _contrib(df):
+    """ส่วนที่แต่ละงานบวกเข้าตารางผลงาน (index = _rid)"""
+    d = df[df['End_Date'].notna() & df['Employee'].notna()]
+    score = d['Score'].astype('float64')
+    return pd.DataFrame({
+        'Year': fiscal_year(d['End_Date']).astype('int64'), 'Employee': d['Employee'].astype(str),
+        'Total': 1, 'ScoreSum': score.fillna(0), 'ScoreN': score.notna().astype('int64'),
+        'Late': _is_late(d['Status']).astype('int64'),
+    }).set_axis(d['_rid'] if '_rid' in d else d.index)
+
+def year_sums(df):
+    """ผลรวมต่อ (ปี, พนักงาน) ที่เก็บไว้ล่วงหน้าคู่กับ partition ของปีที่ปิดแล้ว (คอลัมน์ = storage.ARCHIVE_SUMMARY_COLS)"""
+    return _contrib(df).groupby(['Year', 'Employee'])[_SUMS].sum().reset_index()
+
+def rank_table(sums):
+    """KPI ของปีเดียวจากผลรวมต่อพนักงาน พร้อมอันดับร่วม (ค่าทั้งสามเท่ากัน -> อันดับเดียวกัน 1, 1, 3)"""
+    t = sums.reset_index()[['Employee'] + _SUMS]
+    t['Avg'] = (t['ScoreSum'] / t['ScoreN'].where(t['ScoreN'] > 0)).fillna(0)
+    t['OnTime%'] = (t['Total'] - t['Late']) / t['Total'] * 100
+    t = t.sort_values(RANK_COLS, ascending=False, kind='stable').reset_index(drop=True)
+    t['Rank'] = t.groupby(RANK_COLS, sort=False).ngroup().rank(method='min').astype(int)
+    return t[['Rank', 'Employee', 'Total', 'Avg', 'Late', 'OnTime%']]
+
+def leaderboard(df, year):
+    """ตารางผลงานของปีเดียวแบบคำนวณใหม่ทั้งหมด"""
+    c = _contrib(df)
+    return rank_table(c[c['Year'] == year].groupby('Employee')[_SUMS].sum())
+
+class Leaderboard:
+    """ตารางผลงานรายปีที่อัปเดตเฉพาะงานที่เปลี่ยน
+
+    เก็บผลรวมต่อ (ปี, พนักงาน) ไว้ เมื่อข้อมูลเปลี่ยนจะหักส่วนของงานเดิมแล้วบวกส่วนของงานใหม่
+    เฉพาะ _rid ที่ต่างจากรอบก่อน และจัดอันดับใหม่เฉพาะปีที่ได้รับผลกระทบ
+    งานที่ย้ายไป archive แล้วไม่อยู่ใน df: ผลรวมของปีนั้น (คำนวณไว้ล่วงหน้า) มาจาก sync_archive
+    """
+    REBUILD_RATIO = 0.25   # งานเปลี่ยนเกินสัดส่วนนี้ -> คำนวณใหม่ทั้งหมดเร็วกว่า
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.contrib = None
+        self.sums = None
+        self.boards = {}
+        self.archived = None
+        self.archive_version = None
+        self.rebuilds = self.deltas = 0
+
+    def sync(self, df, version=None):
+        with self.lock:
+            hit = version is not None and version == self.version
+            metrics.lookup('leaderboard', hit=hit)
+            if hit: return
+            new = _contrib(df)
+            old = self.contrib
+            if old is None or not new.index.is_unique:
+                self._rebuild(new)
+            else:
+                idx = old.index.union(new.index)
+                changed = idx[~(old.reindex(idx) == new.reindex(idx)).all(axis=1).to_numpy()]
+                if len(changed) > len(idx) * self.REBUILD_RATIO: self._rebuild(new)
+                elif len(changed): self._apply(old, new, changed)
+            self.contrib, self.version = new, version
+
+    def sync_archive(self, sums, version):
+        """sums = ผลรวมของปีที่เก็บถาวร (storage.summary_frame) ใช้ซ้ำจนกว่า version จะเปลี่ยน"""
+        with self.lock:
+            if version == self.archive_version: return
+            self.archived = sums.set_index(['Year', 'Employee'])[_SUMS]
+            self.archive_version = version
+            self.boards = {}
+
+    def _rebuild(self, new):
+        self.sums = new.groupby(['Year', 'Employee'])[_SUMS].sum()
+        self.boards = {}
+        self.rebuilds += 1
+
+    def _apply(self, old, new, changed):
+        removed = old.loc[old.index.intersection(changed)]
+        added = new.loc[new.index.intersection(changed)]
+        removed = removed.assign(**{c: -removed[c] for c in _SUMS})
+        delta = pd.concat([removed, added]).groupby(['Year', 'Employee'])[_SUMS].sum()
+        sums = self.sums.add(delta, fill_value=0).astype({c: self.sums[c].dtype for c in _SUMS})
+        self.sums = sums[sums['Total'] > 0]
+        for y in delta.index.get_level_values('Year').unique(): self.boards.pop(y, None)
+        self.deltas += 1
+
+    def _parts(self): return [s for s in (self.sums, self.archived) if s is not None]
+
+    def years(self):
+        with self.lock:
+            return sorted({y for s in self._parts() for y in s.index.get_level_values('Year').unique().tolist()}, reverse=True)
+
+    def board(self, year):
+        with self.lock:
+            if year not in self.boards:
+                parts = [s[s.index.get_level_values('Year') == year].droplevel('Year') for s in self._parts()]
+                self.boards[year] = rank_table(pd.concat(parts).groupby(level='Employee')[_SUMS].sum())
+            return self.boards[year]
@@ -0,0 +1,56 @@
+"""สถานะและคะแนนของงานใน Project Tracker (คำนวณทั้งคอลัมน์ ไม่พึ่ง Streamlit)"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+STATUS_DONE = "✅ เสร็จสิ้น"
+STATUS_NOT_STARTED = "🔜 ยังไม่ถึงกำหนดเริ่ม"
+STATUS_LATE = "🔥 ล่าช้า (Late)"
+STATUS_ACTIVE = "⏳ กำลังดำเนินการ"
+STATUS_NO_DATE = "❓ วันที่ระบุไม่ครบ"
+STATUS_ERROR = "Error"
+STATUSES = [STATUS_DONE, STATUS_NOT_STARTED, STATUS_LATE, STATUS_ACTIVE, STATUS_NO_DATE, STATUS_ERROR]
+
+def _parse_day(col):
+    """แปลงคอลัมน์วันที่ (date / datetime / string 'YYYY-MM-DD') เป็น datetime64 ทั้งคอลัมน์
+
+    คืนค่า (วันที่, mask ค่าว่าง, mask string ที่อ่านไม่ได้, mask NaT)
+    NaT แยกจากค่าว่าง: กฎเดิมถือว่า NaT เป็นวันที่ (ผ่านเช็ควันที่ไม่ครบ) แต่เทียบกับวันนี้ไม่ได้ -> Error
+    ชีตที่มีช่องวันที่ว่าง/ผิดรูปแบบโหลดมาเป็น NaT เสมอ (ทั้งแบบเดิมและ coerce_logs)
+    """
+    if pd.api.types.is_datetime64_any_dtype(col):
+        none = np.zeros(len(col), dtype=bool)
+        return col.dt.normalize(), none, none, col.isna().to_numpy()
+    is_str = col.map(lambda x: isinstance(x, str)).to_numpy(dtype=bool)
+    nat = col.map(lambda x: x is pd.NaT).to_numpy(dtype=bool)
+    blank = is_str & (col.astype(str).str.len() == 0).to_numpy()
+    parsed = pd.to_datetime(col.where(~is_str), errors='coerce')
+    parsed_str = pd.to_datetime(col.where(is_str & ~blank), format='%Y-%m-%d', errors='coerce')
+    day = parsed.where(~is_str, parsed_str).dt.normalize()
+    missing = blank | (~is_str & ~nat & parsed.isna().to_numpy())
+    bad = is_str & ~blank & parsed_str.isna().to_numpy()
+    return day, missing, bad, nat
+
+def calculate_status_and_score(df):
+    if df.empty: return df
+    today = pd.Timestamp(date.today())
+    s, s_missing, s_bad, s_nat = _parse_day(df['Start_Date'])
+    e, e_missing, e_bad, e_nat = _parse_day(df['End_Date'])
+    prog = pd.to_numeric(df['Progress'], errors='coerce').to_numpy(dtype=float)
+
+    # เรียงตามลำดับความสำคัญเหมือนเงื่อนไข if/elif เดิม (NaT: เทียบวันที่ตัวไหนก่อน error ตอนนั้น)
+    conds = [
+        s_bad | e_bad,
+        s_missing | e_missing,
+        prog == 100,
+        s_nat,
+        (today < s).to_numpy(),
+        e_nat,
+        (today > e).to_numpy(),
+    ]
+    status = np.select(conds, [STATUS_ERROR, STATUS_NO_DATE, STATUS_DONE, STATUS_ERROR, STATUS_NOT_STARTED, STATUS_ERROR,
+                               STATUS_LATE], default=STATUS_ACTIVE)
+    df['Status'] = pd.Categorical(status, categories=STATUSES)
+    df['Score'] = np.select(conds, [0, 0, 100, 0, np.nan, 0, prog], default=100).astype('float32')
+    return df
@@ -0,0 +1,1397 @@
+"""ชั้นเก็บข้อมูลของ Project Tracker
+
+ทุก backend (Google Sheets / SQLite / Memory / Mirrored) มี interface เดียวกันตาม `Backend`
+ส่วน `DataStore` คือ snapshot กลางของ process ที่ทุก session ใช้ร่วมกัน
+พร้อม writer thread ที่เขียนการแก้ไขลง backend เบื้องหลัง
+"""
+import itertools
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from datetime import datetime, date
+
+import gspread
+import numpy as np
+import pandas as pd
+import requests
+from google.auth.exceptions import RefreshError
+from gspread.utils import numericise_all
+
+import metrics
+
+# ==========================================
+# 1. SCHEMA
+# ==========================================
+LOG_COLS = ['Employee', 'Main_Task', 'Sub_Task', 'Start_Date', 'End_Date', 'Output', 'Issue', 'Log_Count', 'Dependency', 'Progress', 'Score', 'Status',
+            'Row_ID', 'Version']
+SHEET_HEADERS = {'Logs': LOG_COLS, 'Employees': ['Name'], 'Projects': ['Project']}
+
+# Row_ID = id ถาวรของแถว (ไม่เปลี่ยนเมื่อแถวเลื่อนตำแหน่ง), Version = เพิ่มขึ้นทุกครั้งที่แถวถูกแก้
+# ใช้ตรวจว่ามีคนอื่นแก้แถวเดียวกันไปก่อนหรือไม่ (ดูหัวข้อ ROW VERSIONS)
+ROW_ID, VERSION = LOG_COLS.index('Row_ID'), LOG_COLS.index('Version')
+
+# Log Book แยกเป็นตารางต่อท้ายอย่างเดียว (1 แถว = 1 บันทึก) และโหลดเฉพาะตอนเปิดดูประวัติ
+# ตาราง Logs เก็บแค่บันทึกล่าสุด (Issue) กับจำนวนบันทึก (Log_Count)
+LOGBOOK = 'LogBook'
+LOGBOOK_COLS = ['Employee', 'Main_Task', 'Sub_Task', 'Time', 'Entry']
+TASK_KEY = LOGBOOK_COLS[:3]
+
+# ปีงบที่ปิดแล้ว: งานที่เสร็จแล้วถูกย้ายไป partition ของปีนั้น (ชีต Archive_<ปี> / ตาราง archive แยกตามปี)
+# Logs จึงเหลือแค่งานที่ยังเปิดอยู่ + งานของปีปัจจุบัน ส่วนผลรวมต่อ (ปี, พนักงาน) เก็บไว้ล่วงหน้าใน ArchiveSummary
+ARCHIVE_PREFIX = 'Archive_'
+ARCHIVE_SUMMARY = 'ArchiveSummary'
+ARCHIVE_SUMMARY_COLS = ['Year', 'Employee', 'Total', 'ScoreSum', 'ScoreN', 'Late']
+
+def _records(values):
+    # เหมือน get_all_records: แถวแรกเป็นหัวตาราง, ตัวเลขแปลงเป็น int/float
+    if not values: return []
+    header = values[0]
+    return [dict(zip(header, numericise_all(row + [''] * (len(header) - len(row))))) for row in values[1:]]
+
+# ------------------------------------------
+# ใน memory Logs ใช้ dtype ที่กะทัดรัด: ข้อความซ้ำ ๆ เป็น category, วันที่เป็น datetime64[ns]
+# (ไม่มีวันที่ = NaT), Progress เป็น int8 และ Score เป็น float32 (ยังไม่เริ่ม = NaN)
+# แปลงกลับเป็นรูปแบบ string ของชีตเฉพาะตอนบันทึก (_to_sheet_rows)
+# ------------------------------------------
+CATEGORY_COLS = ['Employee', 'Main_Task', 'Sub_Task', 'Dependency', 'Status']
+TEXT_COLS = ['Output', 'Issue', 'Row_ID']
+DATE_COLS = ['Start_Date', 'End_Date']
+DEFAULT_STATUS = "⏳ กำลังดำเนินการ"
+
+def coerce_logs(df):
+    """แปลง DataFrame ของ Logs (จากชีต / ฟอร์ม / ไฟล์) ให้เป็น schema เดียวกันทั้งแอป"""
+    for col in LOG_COLS:
+        if col not in df.columns: df[col] = None
+    for col in DATE_COLS:
+        if not pd.api.types.is_datetime64_ns_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors='coerce').astype('datetime64[ns]')
+        df[col] = df[col].dt.normalize()
+    for col in TEXT_COLS:
+        df[col] = df[col].fillna('').astype(str).replace({'nan': '', 'None': ''})
+    df['Progress'] = pd.to_numeric(df['Progress'], errors='coerce').fillna(0).clip(0, 100).astype('int8')
+    df['Log_Count'] = pd.to_numeric(df['Log_Count'], errors='coerce').fillna(0).astype('int32')
+    df['Version'] = pd.to_numeric(df['Version'], errors='coerce').fillna(0).astype('int32')
+    df['Score'] = pd.to_numeric(df['Score'], errors='coerce').astype('float32')
+    if not isinstance(df['Status'].dtype, pd.CategoricalDtype):
+        df['Status'] = df['Status'].where(df['Status'].notna() & (df['Status'].astype(str) != ''), DEFAULT_STATUS)
+    for col in CATEGORY_COLS:
+        if not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].fillna('').astype(str).astype('category')
+    return df
+
+def logs_frame(data_logs):
+    df_logs = pd.DataFrame(data_logs)
+    if df_logs.empty: df_logs = pd.DataFrame(columns=LOG_COLS)
+    df_logs = coerce_logs(df_logs)
+    df_logs['Score'] = df_logs['Score'].fillna(0)
+    return df_logs
+
+def summary_frame(recs):
+    """ผลรวมของปีที่เก็บถาวร (records / แถว) -> DataFrame ตาม ARCHIVE_SUMMARY_COLS"""
+    s = pd.DataFrame(recs, columns=ARCHIVE_SUMMARY_COLS)
+    return s.astype({'Year': 'int64', 'Employee': str, 'Total': 'int64', 'ScoreSum': 'float64', 'ScoreN': 'int64', 'Late': 'int64'})
+
+def _summary_rows(summary):
+    return [[int(r[0]), str(r[1]), int(r[2]), float(r[3]), int(r[4]), int(r[5])]
+            for r in summary[ARCHIVE_SUMMARY_COLS].itertuples(index=False, name=None)]
+
+def _from_records(recs, header_ok):
+    """records ของทั้ง 3 ตาราง -> (df_logs, employees, projects, synced)
+
+    synced เก็บค่าที่อยู่ใน backend ตอนโหลด เพื่อให้ save เขียนเฉพาะส่วนที่เปลี่ยน
+    (หัวตารางไม่ตรง -> None = เขียนใหม่ทั้งตารางในครั้งแรก)
+    """
+    df_logs = logs_frame(recs['Logs'])
+    emp_list = [r['Name'] for r in recs['Employees']] if header_ok['Employees'] else []
+    proj_list = [r['Project'] for r in recs['Projects']] if header_ok['Projects'] else []
+    loaded = {
+        'Logs': _to_sheet_rows(df_logs),
+        'Employees': [[x] for x in emp_list],
+        'Projects': [[x] for x in proj_list],
+    }
+    synced = {name: _row_keys(rows) if header_ok[name] else None for name, rows in loaded.items()}
+    return df_logs, emp_list, proj_list, synced
+
+def _from_values(tables):
+    # tables = {ชื่อตาราง: ค่าแบบ 2 มิติ (แถวแรก = หัวตาราง)} เหมือนที่ Sheets API คืนมา
+    recs = {name: _records(tables.get(name, [])) for name in SHEET_HEADERS}
+    header_ok = {name: bool(tables.get(name)) and tables[name][0][:len(h)] == h for name, h in SHEET_HEADERS.items()}
+    return _from_records(recs, header_ok)
+
+# ------------------------------------------
+# Change tracking: `log_pos` = ตำแหน่งแถวใน backend ตอนซิงก์ล่าสุดของแต่ละแถว
+# (แถวใหม่ = None) ส่วน `synced` เก็บค่าที่อยู่ใน backend จริง
+# save จึงคำนวณได้ว่าแถวไหนถูกเพิ่ม / แก้ / ลบ แล้วส่งเฉพาะส่วนนั้น
+# ------------------------------------------
+def _to_sheet_rows(df):
+    cols = {}
+    for c in LOG_COLS:
+        col = df[c] if c in df.columns else pd.Series('', index=df.index)
+        if c in DATE_COLS: col = pd.to_datetime(col, errors='coerce').dt.strftime('%Y-%m-%d')
+        elif c in ('Progress', 'Score', 'Log_Count', 'Version'): col = pd.to_numeric(col, errors='coerce').astype('float64')
+        col = col.astype(object)
+        cols[c] = col.where(col.notna(), '')
+    return pd.DataFrame(cols, index=df.index)[LOG_COLS].values.tolist()
+
+def _cell_key(v):
+    # ค่าในชีตกลับมาเป็นตัวเลขบ้าง string บ้าง -> เทียบกันด้วย string ที่ normalize แล้ว
+    if isinstance(v, float):
+        if v != v: return ""
+        if v.is_integer(): return str(int(v))
+    return str(v)
+
+def _row_keys(rows):
+    return [tuple(_cell_key(v) for v in r) for r in rows]
+
+def _list_positions(base, items):
+    index = {k[0]: i for i, k in enumerate(base or [])}
+    return [index.get(_cell_key(x)) for x in items]
+
+def _list_unchanged(base, items):
+    return base is not None and _row_keys([[x] for x in items]) == base
+
+# ------------------------------------------
+# Log Book แบบเดิมเป็นข้อความก้อนเดียวใน Issue ("...\n- [dd/mm] บันทึก") -> แยกเป็นรายการ
+# ------------------------------------------
+_LEGACY_ENTRY = re.compile(r'\n(?=- \[\d{2}/\d{2}\] )')
+_LEGACY_STAMP = re.compile(r'- \[(\d{2}/\d{2})\] (.*)', re.S)
+
+def split_issue_blobs(df):
+    """แถวที่ยังมี Issue แบบเดิม (มีข้อความแต่ Log_Count = 0) -> แถวของ Log Book
+
+    แก้ df ในที่ให้ Issue เหลือบันทึกล่าสุดและ Log_Count = จำนวนบันทึก คืน list แถวสำหรับ append_log
+    """
+    legacy = (df['Log_Count'] == 0) & (df['Issue'] != '')
+    entries = []
+    for i in df.index[legacy.to_numpy()]:
+        key = [str(df.at[i, c]) for c in TASK_KEY]
+        parts = [p.strip() for p in _LEGACY_ENTRY.split(df.at[i, 'Issue']) if p.strip()]
+        for part in parts:
+            m = _LEGACY_STAMP.fullmatch(part)
+            entries.append(key + ([m.group(1), m.group(2).strip()] if m else ['', part]))
+        df.at[i, 'Issue'] = entries[-1][-1] if parts else ''
+        df.at[i, 'Log_Count'] = len(parts)
+    return entries
+
+def _history(rows, employee, project, sub):
+    key = tuple(_cell_key(x) for x in (employee, project, sub))
+    return [(str(r[3]), str(r[4])) for r in rows if tuple(_cell_key(x) for x in r[:3]) == key]
+
+def _index_history(index, rows):
+    # {(พนักงาน, โปรเจกต์, งาน): [(เวลา, ข้อความ), ...]} ต่อท้ายตามลำดับที่บันทึก
+    for r in rows: index.setdefault(tuple(_cell_key(x) for x in r[:3]), []).append((str(r[3]), str(r[4])))
+    return index
+
+# ==========================================
+# 2. BACKEND INTERFACE
+# ==========================================
+class Backend:
+    """interface ที่ DataStore ใช้
+
+    load()  -> (df_logs, employees, projects, synced)
+    save(df, employees, projects, synced, log_pos) -> synced ชุดใหม่ (error -> raise)
+        backend ที่เขียนแบบมีเงื่อนไขได้ จะ raise StaleWrite ถ้า Version ของแถวใน backend ไม่ตรงกับ synced
+    revision() -> ค่าที่เปลี่ยนทุกครั้งที่ข้อมูลถูกแก้ (None = ไม่รู้ ต้องโหลดใหม่)
+    written_revision() -> revision หลังการเขียนครั้งล่าสุดของ backend นี้เอง (None = ไม่รู้)
+        DataStore นับว่าไม่มีใครแก้เฉพาะเมื่อ revision() ตรงกับค่านี้หรือค่าตอนโหลดพอดี
+    append_log(rows) -> ต่อท้ายแถว Log Book (ตาม LOGBOOK_COLS) โดยไม่แตะแถวเดิม
+    log_history(employee, project, sub) -> [(เวลา, ข้อความ), ...] ของงานนั้นตามลำดับที่บันทึก
+        (เฉพาะ backend ที่ค้นรายงานได้เอง history_indexed = True; ที่เหลือ DataStore แคช logbook_rows() ทั้งตาราง)
+    logbook_rows() -> ทุกแถวของ Log Book (ไม่รวมหัวตาราง)
+    archive_summary() -> ผลรวมของทุกปีที่เก็บถาวร (summary_frame, ตารางเล็ก)
+    load_archive(year) -> งานใน partition ของปีนั้น (schema เดียวกับ Logs, ไม่มี -> ว่าง)
+    save_archive(year, df, summary) -> เขียน partition ของปีนั้นทับทั้งชุด พร้อมผลรวมของปีนั้น
+    """
+    name = ''
+    history_indexed = False
+
+    def load(self): raise NotImplementedError
+
+    def save(self, df, employees, projects, synced, log_pos): raise NotImplementedError
+
+    def revision(self): return None
+
+    def written_revision(self): return None
+
+    def append_log(self, rows): raise NotImplementedError
+
+    def log_history(self, employee, project, sub): return []
+
+    def logbook_rows(self): return []
+
+    def archive_summary(self): return summary_frame([])
+
+    def load_archive(self, year): return logs_frame([])
+
+    def save_archive(self, year, df, summary): raise NotImplementedError
+
+    def sync_state(self): return None
+
+    def close(self): pass
+
+class StaleWrite(Exception):
+    """แถวใน backend ถูกแก้จากที่อื่นหลังซิงก์ล่าสุด (การเขียนทั้งชุดถูกยกเลิก)"""
+
+# ==========================================
+# 3. GOOGLE SHEETS
+# ==========================================
+def sheet_revision(sh):
+    # เวลาแก้ไขล่าสุดของไฟล์จาก Drive API (เรียกถูกกว่าการโหลดทั้งชีตมาก); อ่านไม่ได้ -> None
+    try:
+        rev = sh.get_lastUpdateTime() if hasattr(sh, 'get_lastUpdateTime') else sh.lastUpdateTime
+        return datetime.fromisoformat(rev.replace('Z', '+00:00')).timestamp()
+    except Exception:
+        return None
+
+def _batch_values(sh, names):
+    # ค่าทั้งชีตของหลายชีตใน request เดียว (ทุกชีตต้องมีอยู่จริง ไม่งั้นทั้ง request ล้ม)
+    res = sh.values_batch_get([f"'{name}'" for name in names])
+    return dict(zip(names, [vr.get('values', []) for vr in res.get('valueRanges', [])]))
+
+def load_data(sh):
+    # ดึงทั้ง 3 ชีตใน request เดียว
+    return _from_values(_batch_values(sh, list(SHEET_HEADERS)))
+
+def _cell_data(v):
+    if isinstance(v, (int, float)) and not isinstance(v, bool):
+        return {'userEnteredValue': {'numberValue': v}}
+    return {'userEnteredValue': {'stringValue': str(v)}}
+
+def _rows_data(rows):
+    return [{'values': [_cell_data(v) for v in r]} for r in rows]
+
+def _rewrite_requests(sheet_id, header, rows):
+    # ล้างแล้วเขียนใหม่ใน batch เดียว (atomic) -> ชีตไม่ว่างเปล่าระหว่างเขียน
+    # ใช้ appendCells หลังล้าง: updateCells เขียนเกินจำนวนแถวของ grid ไม่ได้ (ชีตเล็กกว่าข้อมูลชุดใหม่ -> 400)
+    return [
+        {'updateCells': {'range': {'sheetId': sheet_id}, 'fields': 'userEnteredValue'}},
+        {'appendCells': {'sheetId': sheet_id, 'rows': _rows_data([header] + rows), 'fields': 'userEnteredValue'}},
+    ]
+
+def _ranges(positions):
+    # ตำแหน่งที่เรียงแล้ว -> ช่วงที่ติดกัน [(start, end), ...] (end ไม่รวม) ลบทีละช่วงแทนทีละแถว
+    out = []
+    for p in positions:
+        if out and out[-1][1] == p: out[-1][1] = p + 1
+        else: out.append([p, p + 1])
+    return [tuple(r) for r in out]
+
+def _delta_requests(sheet_id, header, base, rows, pos, keys=None):
+    """คำนวณ request ที่ต้องส่งให้ชีตตรงกับ `rows`
+
+    base = keys ของแถวบนชีต, pos = ตำแหน่งใน base ของแต่ละแถวใน rows (None = แถวใหม่)
+    keys = _row_keys(rows) ถ้าคำนวณไว้แล้ว
+    ถ้าลำดับแถวเปลี่ยน (แถวเดิมไม่เรียงตาม base หรือแถวใหม่ไม่อยู่ท้าย) จะเขียนใหม่ทั้งชีต
+    """
+    if base is None: return _rewrite_requests(sheet_id, header, rows)
+    kept = [p for p in pos if p is not None]
+    n_kept = len(kept)
+    if any(p is None for p in pos[:n_kept]) or any(a >= b for a, b in zip(kept, kept[1:])):
+        return _rewrite_requests(sheet_id, header, rows)
+
+    reqs = []
+    kept_set = set(kept)
+    deleted = [p for p in range(len(base)) if p not in kept_set]
+    for start, end in reversed(_ranges(deleted)):  # ลบจากล่างขึ้นบน index จะได้ไม่เลื่อน
+        reqs.append({'deleteDimension': {'range': {'sheetId': sheet_id, 'dimension': 'ROWS', 'startIndex': start + 1, 'endIndex': end + 1}}})
+
+    if keys is None: keys = _row_keys(rows)
+    for new_i, (p, key) in enumerate(zip(kept, keys)):
+        if key != base[p]:
+            reqs.append({'updateCells': {'start': {'sheetId': sheet_id, 'rowIndex': new_i + 1, 'columnIndex': 0},
+                                         'rows': _rows_data([rows[new_i]]), 'fields': 'userEnteredValue'}})
+    if len(rows) > n_kept:
+        reqs.append({'appendCells': {'sheetId': sheet_id, 'rows': _rows_data(rows[n_kept:]), 'fields': 'userEnteredValue'}})
+    return reqs
+
+def save_data(sh, df, employees, projects, synced, log_pos, worksheet=None):
+    """เขียนเฉพาะแถวที่เปลี่ยนเทียบกับ `synced` ลงชีตใน batch_update เดียว แล้วคืน synced ชุดใหม่
+
+    log_pos = ตำแหน่งแถวบนชีต (ตาม synced) ของแต่ละแถวใน df, None = แถวใหม่
+    """
+    worksheet = worksheet or sh.worksheet
+    log_rows = _to_sheet_rows(df)
+    log_keys = _row_keys(log_rows)
+    emp_rows = [[x] for x in employees]
+    proj_rows = [[x] for x in projects]
+
+    targets = {
+        'Logs': (log_rows, log_pos),
+        'Employees': (emp_rows, _list_positions(synced.get('Employees'), employees)),
+        'Projects': (proj_rows, _list_positions(synced.get('Projects'), projects)),
+    }
+    requests = []
+    for name, (rows, pos) in targets.items():
+        base = synced.get(name)
+        # Employees / Projects เขียนเฉพาะตอนที่รายชื่อเปลี่ยนจริง
+        if name != 'Logs' and _list_unchanged(base, [r[0] for r in rows]): continue
+        requests += _delta_requests(worksheet(name).id, SHEET_HEADERS[name], base, rows, pos,
+                                    keys=log_keys if name == 'Logs' else None)
+    if requests: sh.batch_update({'requests': requests})
+
+    return {'Logs': log_keys, 'Employees': _row_keys(emp_rows), 'Projects': _row_keys(proj_rows)}
+
+class SheetsBackend(Backend):
+    """Sheets API เขียนแบบมีเงื่อนไขไม่ได้ -> DataStore เช็คเวลาแก้ไขล่าสุดของไฟล์ก่อนเขียนแทน
+
+    หลังเขียนเองทุกครั้งอ่านเวลาแก้ไขกลับทันที (written_revision): เวลาอื่นที่ไม่ตรงค่านี้ = มีคนเขียนแทรก
+    """
+    name = 'Google Sheets'
+
+    def __init__(self, connect, reset=None):
+        # connect() -> gspread Spreadsheet (หรือ None ถ้าต่อไม่ได้), reset() -> ทิ้ง connection เดิม
+        self.connect = connect
+        self._reset = reset
+        self._ws = None
+        self._written = None
+        self._summary = None     # ค่าชีต ArchiveSummary ที่มากับการโหลดครั้งล่าสุด (archive_summary ใช้แทนการอ่านซ้ำ)
+
+    def _spreadsheet(self):
+        sh = self.connect()
+        if sh is None: raise RuntimeError("เชื่อมต่อ Google Sheets ไม่ได้")
+        return sh
+
+    def worksheet(self, sh, name):
+        # worksheet handle ใช้ซ้ำได้ ไม่ต้องถาม metadata ทุกครั้ง
+        if self._ws is None: self._ws = {ws.title: ws for ws in sh.worksheets()}
+        if name not in self._ws: self._ws[name] = sh.worksheet(name)
+        return self._ws[name]
+
+    def reset(self):
+        # handle เก่าอาจใช้ไม่ได้แล้ว (token ถูกเพิกถอน / ชีตถูกเปลี่ยนชื่อ) -> ต่อใหม่รอบหน้า
+        self._ws = None
+        if self._reset: self._reset()
+
+    @contextmanager
+    def _api(self):
+        # ทิ้ง handle เฉพาะ error ที่แปลว่า handle เดิมใช้ไม่ได้แล้ว; 429 / 5xx ใช้ handle เดิมลองใหม่
+        # (ต่อใหม่ = auth + open + อ่าน metadata ซ้ำ ยิ่งเปลือง quota ตอนที่ quota กำลังหมด)
+        try: yield
+        except Exception as e:
+            if _is_stale_handle(e): self.reset()
+            raise
+
+    def load(self):
+        with self._api():
+            sh = self._spreadsheet()
+            # ผลรวม archive มาใน request เดียวกัน ถ้ามีชีตแล้ว (ดูจากรายชื่อชีตที่แคชไว้ ชีตที่ไม่มีใส่ใน batch ไม่ได้)
+            if self._ws is None: self._ws = {ws.title: ws for ws in sh.worksheets()}
+            names = list(SHEET_HEADERS) + [ARCHIVE_SUMMARY] * (ARCHIVE_SUMMARY in self._ws)
+            values = _batch_values(sh, names)
+            self._summary = values.get(ARCHIVE_SUMMARY, [])
+            return _from_values(values)
+
+    def save(self, df, employees, projects, synced, log_pos):
+        with self._api():
+            sh = self._spreadsheet()
+            new = save_data(sh, df, employees, projects, synced, log_pos, worksheet=lambda name: self.worksheet(sh, name))
+            if new != synced: self._wrote(sh)  # synced เท่าเดิม = ไม่มี request ถูกส่ง ไม่ต้องอ่านกลับ
+            return new
+
+    def _wrote(self, sh): self._written = sheet_revision(sh)
+
+    def _ensure(self, sh, name, header):
+        # ชีตที่สร้างเมื่อใช้ครั้งแรก (Log Book / archive) พร้อมหัวตาราง
+        try: return self.worksheet(sh, name)
+        except gspread.exceptions.WorksheetNotFound:
+            ws = sh.add_worksheet(name, rows=1, cols=len(header))
+            ws.append_row(header, value_input_option='RAW')
+            self._ws[name] = ws
+            return ws
+
+    def _logbook(self, sh): return self._ensure(sh, LOGBOOK, LOGBOOK_COLS)
+
+    def append_log(self, rows):
+        # appendCells ต่อท้ายอย่างเดียว ไม่ต้องอ่านหรือเขียนประวัติเดิมซ้ำ
+        with self._api():
+            sh = self._spreadsheet()
+            self._logbook(sh).append_rows(rows, value_input_option='RAW')
+            self._wrote(sh)
+
+    def logbook_rows(self): return (self._values(LOGBOOK) or [None])[1:]
+
+    def _values(self, name):
+        # ค่าทั้งชีต; ยังไม่มีชีตนี้ -> None
+        with self._api():
+            try: return self.worksheet(self._spreadsheet(), name).get_all_values()
+            except gspread.exceptions.WorksheetNotFound: return None
+
+    def archive_summary(self):
+        # ต่อจาก load ใช้ค่าที่มากับการโหลด (ครั้งเดียว) ไม่งั้นอ่านชีตใหม่
+        values, self._summary = self._summary, None
+        if values is None: values = self._values(ARCHIVE_SUMMARY)
+        return summary_frame(_records(values or []))
+
+    def load_archive(self, year): return logs_frame(_records(self._values(f"{ARCHIVE_PREFIX}{year}") or []))
+
+    def save_archive(self, year, df, summary):
+        # partition ของปี + ผลรวมทุกปี เขียนทับใน batch_update เดียว (atomic)
+        with self._api():
+            sh = self._spreadsheet()
+            part = self._ensure(sh, f"{ARCHIVE_PREFIX}{year}", LOG_COLS)
+            summ = self._ensure(sh, ARCHIVE_SUMMARY, ARCHIVE_SUMMARY_COLS)
+            others = summary_frame(_records(summ.get_all_values()))
+            others = others[others['Year'] != year]
+            rows = _summary_rows(pd.concat([others, summary]).sort_values(['Year', 'Employee']))
+            sh.batch_update({'requests': _rewrite_requests(part.id, LOG_COLS, _to_sheet_rows(df))
+                                         + _rewrite_requests(summ.id, ARCHIVE_SUMMARY_COLS, rows)})
+            self._wrote(sh)
+
+    def revision(self):
+        sh = self.connect()
+        return sheet_revision(sh) if sh else None
+
+    def written_revision(self): return self._written
+
+# ==========================================
+# 4. SQLITE
+# ==========================================
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY,
+    Employee TEXT, Main_Task TEXT, Sub_Task TEXT, Start_Date TEXT, End_Date TEXT,
+    Output TEXT, Issue TEXT, Log_Count NUMERIC, Dependency TEXT, Progress NUMERIC, Score NUMERIC, Status TEXT,
+    Row_ID TEXT, Version NUMERIC
+);
+CREATE INDEX IF NOT EXISTS ix_logs_employee ON logs(Employee);
+CREATE INDEX IF NOT EXISTS ix_logs_task ON logs(Main_Task, Sub_Task);
+CREATE INDEX IF NOT EXISTS ix_logs_end ON logs(End_Date);
+CREATE TABLE IF NOT EXISTS employees (pos INTEGER PRIMARY KEY, Name TEXT);
+CREATE TABLE IF NOT EXISTS projects (pos INTEGER PRIMARY KEY, Project TEXT);
+CREATE TABLE IF NOT EXISTS logbook (
+    id INTEGER PRIMARY KEY,
+    Employee TEXT, Main_Task TEXT, Sub_Task TEXT, Time TEXT, Entry TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_logbook_task ON logbook(Main_Task, Sub_Task, Employee);
+CREATE TABLE IF NOT EXISTS archive (
+    id INTEGER PRIMARY KEY, Year INTEGER,
+    Employee TEXT, Main_Task TEXT, Sub_Task TEXT, Start_Date TEXT, End_Date TEXT,
+    Output TEXT, Issue TEXT, Log_Count NUMERIC, Dependency TEXT, Progress NUMERIC, Score NUMERIC, Status TEXT,
+    Row_ID TEXT, Version NUMERIC
+);
+CREATE INDEX IF NOT EXISTS ix_archive_year ON archive(Year);
+CREATE TABLE IF NOT EXISTS archive_summary (
+    Year INTEGER, Employee TEXT, Total INTEGER, ScoreSum REAL, ScoreN INTEGER, Late INTEGER
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+INSERT OR IGNORE INTO meta VALUES ('revision', 0);
+"""
+
+class SQLiteBackend(Backend):
+    """ไฟล์ SQLite ในเครื่อง: อ่าน/เขียนเร็ว ไม่ติด quota และใช้ได้แบบ offline
+
+    synced เก็บ id ของแต่ละแถวเพิ่ม ('ids') เพื่อแปลง log_pos เป็น primary key
+    แก้ / ลบแถวแบบมีเงื่อนไข (WHERE Version = ค่าตอนซิงก์) ถ้ามีแถวไหนไม่ตรง -> rollback แล้ว raise StaleWrite
+    """
+    name = 'SQLite'
+    history_indexed = True  # ค้นรายงานด้วย index ได้ ไม่ต้องแคชทั้งตาราง
+
+    def __init__(self, path):
+        self.path = path
+        self._written = None
+        with self._tx() as con:
+            con.executescript(SQLITE_SCHEMA)
+            # ไฟล์ที่สร้างก่อนมีคอลัมน์ Log_Count / Row_ID / Version
+            cols = [r[1] for r in con.execute("PRAGMA table_info(logs)")]
+            for col, kind in (('Log_Count', 'NUMERIC'), ('Row_ID', 'TEXT'), ('Version', 'NUMERIC')):
+                if col not in cols: con.execute(f"ALTER TABLE logs ADD COLUMN {col} {kind}")
+
+    @contextmanager
+    def _tx(self):
+        with closing(sqlite3.connect(self.path, timeout=30)) as con:
+            with con: yield con
+
+    def load(self):
+        with self._tx() as con:
+            cols = ', '.join(LOG_COLS)
+            recs = {
+                'Logs': [dict(zip(LOG_COLS, r)) for r in con.execute(f"SELECT {cols} FROM logs ORDER BY id")],
+                'Employees': [{'Name': r[0]} for r in con.execute("SELECT Name FROM employees ORDER BY pos")],
+                'Projects': [{'Project': r[0]} for r in con.execute("SELECT Project FROM projects ORDER BY pos")],
+            }
+            ids = [r[0] for r in con.execute("SELECT id FROM logs ORDER BY id")]
+        df, emps, projs, synced = _from_records(recs, {name: True for name in SHEET_HEADERS})
+        synced['ids'] = ids
+        return df, emps, projs, synced
+
+    def save(self, df, employees, projects, synced, log_pos):
+        rows = _to_sheet_rows(df)
+        keys = _row_keys(rows)
+        base, ids = synced.get('Logs'), synced.get('ids') or []
+        cols = ', '.join(LOG_COLS)
+        insert = f"INSERT INTO logs ({cols}) VALUES ({', '.join('?' * len(LOG_COLS))})"
+        same_version = "id = ? AND COALESCE(Version, 0) = ?"
+        update = f"UPDATE logs SET {', '.join(c + ' = ?' for c in LOG_COLS)} WHERE {same_version}"
+        version = lambda p: int(float(base[p][VERSION] or 0))
+
+        with self._tx() as con:
+            if base is None:
+                con.execute("DELETE FROM logs")
+                log_pos = [None] * len(rows)
+            else:
+                kept = {p for p in log_pos if p is not None}
+                deletes = [(ids[p], version(p)) for p in range(len(base)) if p not in kept]
+                if con.executemany(f"DELETE FROM logs WHERE {same_version}", deletes).rowcount != len(deletes):
+                    raise StaleWrite("แถวที่จะลบถูกแก้จากที่อื่น")
+            new_ids, updates = [], []
+            for row, key, p in zip(rows, keys, log_pos):
+                if p is None:
+                    new_ids.append(con.execute(insert, row).lastrowid)
+                else:
+                    new_ids.append(ids[p])
+                    if key != base[p]: updates.append(row + [ids[p], version(p)])
+            if con.executemany(update, updates).rowcount != len(updates):
+                raise StaleWrite("แถวที่จะแก้ถูกแก้จากที่อื่น")
+
+            for name, table, col, items in [('Employees', 'employees', 'Name', employees), ('Projects', 'projects', 'Project', projects)]:
+                if _list_unchanged(synced.get(name), items): continue
+                con.execute(f"DELETE FROM {table}")
+                con.executemany(f"INSERT INTO {table} (pos, {col}) VALUES (?, ?)", list(enumerate(items)))
+
+            con.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+            self._written = con.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+        return {'Logs': keys, 'ids': new_ids,
+                'Employees': _row_keys([[x] for x in employees]), 'Projects': _row_keys([[x] for x in projects])}
+
+    def append_log(self, rows):
+        cols = ', '.join(LOGBOOK_COLS)
+        with self._tx() as con:
+            con.executemany(f"INSERT INTO logbook ({cols}) VALUES ({', '.join('?' * len(LOGBOOK_COLS))})", rows)
+
+    def log_history(self, employee, project, sub):
+        with self._tx() as con:
+            return [tuple(r) for r in con.execute(
+                "SELECT Time, Entry FROM logbook WHERE Main_Task = ? AND Sub_Task = ? AND Employee = ? ORDER BY id",
+                (str(project), str(sub), str(employee)))]
+
+    def archive_summary(self):
+        with self._tx() as con:
+            return summary_frame(con.execute(f"SELECT {', '.join(ARCHIVE_SUMMARY_COLS)} FROM archive_summary").fetchall())
+
+    def load_archive(self, year):
+        with self._tx() as con:
+            rows = con.execute(f"SELECT {', '.join(LOG_COLS)} FROM archive WHERE Year = ? ORDER BY id", (int(year),))
+            return logs_frame([dict(zip(LOG_COLS, r)) for r in rows])
+
+    def save_archive(self, year, df, summary):
+        # ไม่เพิ่ม revision: ข้อมูลที่ session เห็นเปลี่ยนตอนลบแถวออกจาก logs (save) อยู่แล้ว
+        cols = ', '.join(['Year'] + LOG_COLS)
+        with self._tx() as con:
+            con.execute("DELETE FROM archive WHERE Year = ?", (int(year),))
+            con.executemany(f"INSERT INTO archive ({cols}) VALUES ({', '.join('?' * (len(LOG_COLS) + 1))})",
+                            [[int(year)] + r for r in _to_sheet_rows(df)])
+            con.execute("DELETE FROM archive_summary WHERE Year = ?", (int(year),))
+            con.executemany(f"INSERT INTO archive_summary VALUES ({', '.join('?' * len(ARCHIVE_SUMMARY_COLS))})",
+                            _summary_rows(summary))
+
+    def revision(self):
+        with self._tx() as con:
+            return con.execute("SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def written_revision(self): return self._written
+
+# ==========================================
+# 5. MEMORY (ใช้ทดสอบ / รันแบบ offline)
+# ==========================================
+class MemoryBackend(Backend):
+    """เก็บค่าในรูปแบบเดียวกับชีต (list ของแถว, แถวแรก = หัวตาราง) ไว้ใน RAM"""
+    name = 'Memory'
+
+    def __init__(self, tables=None):
+        self.tables = {name: [list(h)] for name, h in SHEET_HEADERS.items()}
+        self.tables[LOGBOOK] = [list(LOGBOOK_COLS)]
+        self.tables.update({name: [list(r) for r in rows] for name, rows in (tables or {}).items()})
+        self.rev = 0
+        self._written = None
+        self.loads = 0
+        self.saves = 0
+
+    def load(self):
+        self.loads += 1
+        return _from_values({name: [list(r) for r in rows] for name, rows in self.tables.items()})
+
+    def save(self, df, employees, projects, synced, log_pos):
+        self.saves += 1
+        rows = _to_sheet_rows(df)
+        self.tables.update({'Logs': [LOG_COLS] + rows, 'Employees': [['Name']] + [[x] for x in employees],
+                            'Projects': [['Project']] + [[x] for x in projects]})
+        self.rev += 1
+        self._written = self.rev
+        return {'Logs': _row_keys(rows), 'Employees': _row_keys(self.tables['Employees'][1:]),
+                'Projects': _row_keys(self.tables['Projects'][1:])}
+
+    def append_log(self, rows): self.tables[LOGBOOK] += [list(r) for r in rows]
+
+    def logbook_rows(self): return [list(r) for r in self.tables[LOGBOOK][1:]]
+
+    def archive_summary(self): return summary_frame(self.tables.get(ARCHIVE_SUMMARY, [None])[1:])
+
+    def load_archive(self, year): return logs_frame(_records(self.tables.get(f"{ARCHIVE_PREFIX}{year}", [])))
+
+    def save_archive(self, year, df, summary):
+        self.tables[f"{ARCHIVE_PREFIX}{year}"] = [LOG_COLS] + _to_sheet_rows(df)
+        others = [r for r in self.tables.get(ARCHIVE_SUMMARY, [None])[1:] if r[0] != year]
+        self.tables[ARCHIVE_SUMMARY] = [ARCHIVE_SUMMARY_COLS] + others + _summary_rows(summary)
+
+    def revision(self): return self.rev
+
+    def written_revision(self): return self._written
+
+# ==========================================
+# 6. BACKGROUND FLUSH
+# ==========================================
+FLUSH_DELAY = 1.5      # วินาที: รอรวมการแก้ที่เข้ามาติด ๆ กันเป็นการเขียนครั้งเดียว
+FLUSH_BACKOFF_MAX = 60  # วินาที: เพดานของ exponential backoff ตอนโดน 429 / 5xx
+
+def _status(e): return getattr(getattr(e, 'response', None), 'status_code', 0) or 0
+
+def _is_retryable(e):
+    # 429 (quota) / 5xx / network -> ลองใหม่ได้, 4xx อื่น ๆ (สิทธิ์ / request ผิด) -> ไม่ลองซ้ำเอง
+    if isinstance(e, gspread.exceptions.APIError):
+        code = _status(e)
+        return code == 429 or code >= 500
+    return True
+
+def _is_stale_handle(e):
+    # สิทธิ์หมด / ไม่พบไฟล์หรือชีต / connection หลุด -> client และ worksheet handle เดิมใช้ต่อไม่ได้
+    if isinstance(e, (gspread.exceptions.SpreadsheetNotFound, gspread.exceptions.WorksheetNotFound, RefreshError,
+                      requests.exceptions.ConnectionError)): return True
+    return isinstance(e, gspread.exceptions.APIError) and _status(e) in (401, 403, 404)
+
+class Flusher:
+    """thread เบื้องหลังที่เรียก `flush` หลังมีการแก้ไข (flush ต้อง raise ถ้าเขียนไม่สำเร็จ)"""
+
+    def __init__(self, flush, name, delay=FLUSH_DELAY):
+        self.flush = flush
+        self.name = name
+        self.delay = delay
+        self.failures = 0
+        self.last_error = None
+        self.retry_at = None
+        self.wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def kick(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+        self.wake.set()
+
+    def run_once(self):
+        with self._lock:
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Save Error ({self.name}): {e}")
+                metrics.inc('store_errors', writer=self.name)
+                self.failures += 1
+                self.last_error = e
+                return False
+            self.failures, self.last_error, self.retry_at = 0, None, None
+            return True
+
+    def _run(self):
+        while True:
+            self.wake.wait()
+            time.sleep(self.delay)
+            self.wake.clear()
+            if self.run_once(): continue
+            if not _is_retryable(self.last_error):
+                continue  # รอการแก้ไขครั้งถัดไปค่อยลองใหม่ (ข้อความ error ค้างไว้ที่ sidebar)
+            delay = min(FLUSH_BACKOFF_MAX, 2 ** self.failures) + random.uniform(0, 1)
+            self.retry_at = time.time() + delay
+            time.sleep(delay)
+            self.wake.set()
+
+    def close(self):
+        # ตอนปิด process: เขียนของที่ค้างให้หมดก่อน (ลองซ้ำเล็กน้อยถ้าโดน quota)
+        for attempt in range(3):
+            if self.run_once(): return
+            time.sleep(2 ** attempt)
+
+    def state(self, pending):
+        if self.last_error is not None and pending:
+            wait = max(0, int(self.retry_at - time.time())) if self.retry_at else None
+            return 'error', f"{self.last_error}", wait
+        if pending: return 'pending', None, None
+        return 'synced', None, None
+
+# ==========================================
+# 7. MIRROR (SQLite เป็นหลัก + สำเนาบน Sheets)
+# ==========================================
+class MirroredBackend(Backend):
+    """อ่าน/เขียนที่ `primary` แล้วค่อยทยอยส่งสำเนาไป `mirror` เบื้องหลัง
+
+    ต้องมีคอลัมน์ `_rid` ใน df (DataStore ใส่ให้) เพื่อจับคู่แถวกับตำแหน่งใน mirror
+    """
+
+    def __init__(self, primary, mirror):
+        self.primary, self.mirror = primary, mirror
+        self.name = f"{primary.name} → {mirror.name}"
+        self.history_indexed = primary.history_indexed
+        self._lock = threading.Lock()
+        self._latest = None
+        self._synced = {}  # สถานะของ mirror ({} = ยังไม่รู้ -> เขียนใหม่ทั้งชีตครั้งแรก)
+        self._row_of = {}
+        self._log_rows = []  # แถว Log Book ที่ยังไม่ได้ส่งไป mirror
+        self._archives = {}  # ปี -> (partition, ผลรวม) ที่ยังไม่ได้ส่งไป mirror
+        self.flusher = Flusher(self._flush_mirror, name=f"mirror-{mirror.name}")
+
+    def load(self):
+        df, emps, projs, synced = self.primary.load()
+        if df.empty and not emps and not projs:
+            # ฐานข้อมูล local ยังว่าง -> ตั้งต้นจากข้อมูลใน mirror (เช่น ชีตเดิม)
+            df, emps, projs, _ = self.mirror.load()
+            synced = self.primary.save(df, emps, projs, {}, [None] * len(df))
+            # Log Book ด้วย ไม่งั้นประวัติเดิมหายจากหน้าจอ (เขียนตรงที่ primary ไม่ส่งกลับไป mirror ซ้ำ)
+            n = len(LOGBOOK_COLS)
+            log_rows = [(list(r) + [''] * n)[:n] for r in self.mirror.logbook_rows()]
+            if log_rows: self.primary.append_log(log_rows)
+            # ...และงานของปีที่เก็บถาวร (partition + ผลรวม) ไม่งั้นตารางผลงานปีเก่าว่าง
+            sums = self.mirror.archive_summary()
+            for year in sorted({int(y) for y in sums['Year']}):
+                self.primary.save_archive(year, self.mirror.load_archive(year), sums[sums['Year'] == year])
+        return df, emps, projs, synced
+
+    def save(self, df, employees, projects, synced, log_pos):
+        new_synced = self.primary.save(df, employees, projects, synced, log_pos)
+        with self._lock: self._latest = (df, tuple(employees), tuple(projects))
+        self.flusher.kick()
+        return new_synced
+
+    def append_log(self, rows):
+        self.primary.append_log(rows)
+        with self._lock: self._log_rows += rows
+        self.flusher.kick()
+
+    def log_history(self, employee, project, sub): return self.primary.log_history(employee, project, sub)
+
+    def logbook_rows(self): return self.primary.logbook_rows()
+
+    def archive_summary(self): return self.primary.archive_summary()
+
+    def load_archive(self, year): return self.primary.load_archive(year)
+
+    def save_archive(self, year, df, summary):
+        self.primary.save_archive(year, df, summary)
+        with self._lock: self._archives[year] = (df, summary)
+        self.flusher.kick()
+
+    def _flush_mirror(self):
+        with self._lock: log_rows = list(self._log_rows)
+        if log_rows:
+            self.mirror.append_log(log_rows)
+            with self._lock: del self._log_rows[:len(log_rows)]
+        # partition ต้องถึง mirror ก่อนการลบแถวออกจาก Logs ของ mirror
+        with self._lock: archives = dict(self._archives)
+        for year, part in archives.items():
+            self.mirror.save_archive(year, *part)
+            with self._lock:
+                if self._archives.get(year) is part: del self._archives[year]
+        with self._lock: latest, self._latest = self._latest, None
+        if latest is None: return
+        df, emps, projs = latest
+        try:
+            pos = [self._row_of.get(rid) for rid in df['_rid']]
+            self._synced = self.mirror.save(df, emps, projs, self._synced, pos)
+        except Exception:
+            with self._lock:
+                if self._latest is None: self._latest = latest
+            raise
+        self._row_of = {rid: i for i, rid in enumerate(df['_rid'])}
+
+    def revision(self): return self.primary.revision()
+
+    def written_revision(self): return self.primary.written_revision()
+
+    def sync_state(self):
+        return self.flusher.state(self._latest is not None or bool(self._log_rows) or bool(self._archives))
+
+    def close(self): self.flusher.close()
+
+# ==========================================
+# 8. ROW VERSIONS (optimistic concurrency)
+# ==========================================
+# ไม่ล็อกแถว: ทุกคนแก้ได้พร้อมกัน แล้วตรวจตอนเขียนว่าแถวถูกแก้จากที่อื่นหรือไม่
+#   - ตอน commit: op 'set' จาก dialog ส่งค่าที่ผู้ใช้เห็นตอนเปิด (base) มาด้วย เทียบกับค่าปัจจุบันทีละช่อง
+#   - ตอนเขียนลง backend: ถ้า backend ถูกแก้จากที่อื่น โหลดใหม่แล้ว merge แบบ 3-way ต่อแถว / ต่อช่อง (rebase)
+# ช่องที่มีคนแก้คนเดียว merge ให้เอง; ช่องที่ทั้งสองฝั่งแก้เป็นค่าต่างกันเท่านั้นที่นับเป็น conflict
+MERGE_SKIP = {'Row_ID', 'Version', 'Status', 'Score'}  # Status / Score คำนวณใหม่จากช่องอื่นหลัง merge
+MERGE_COLS = [j for j, c in enumerate(LOG_COLS) if c not in MERGE_SKIP]
+ROW_DELETED = '<deleted>'  # mine / theirs ของ conflict ทั้งแถว (col = None): ฝั่งนั้นลบแถว
+
+class WriteConflict(Exception):
+    """การแก้ชนกับการแก้ของคนอื่นที่เขียนไปก่อน (conflicts = list ของ dict ต่อช่อง)"""
+
+    def __init__(self, conflicts):
+        super().__init__(f"ข้อมูลถูกแก้จากที่อื่น {len(conflicts)} ช่อง")
+        self.conflicts = conflicts
+
+def new_row_ids(n):
+    # ขึ้นต้นด้วยตัวอักษร: Sheets จะไม่ตีความเป็นตัวเลข (เช่น '12e45...')
+    return [f"r{uuid.uuid4().hex[:12]}" for _ in range(n)]
+
+def assign_row_ids(df):
+    """ใส่ Row_ID ให้แถวที่ยังไม่มี (ข้อมูลก่อนมีคอลัมน์นี้) คืนจำนวนแถวที่ใส่"""
+    missing = (df['Row_ID'] == '').to_numpy()
+    n = int(missing.sum())
+    if n: df.loc[missing, 'Row_ID'] = new_row_ids(n)
+    return n
+
+def cell_text(col, v):
+    """ค่าของช่องในรูปแบบที่เก็บในชีต (ใช้เทียบค่าและแสดงผล)"""
+    if col in DATE_COLS: return '' if v is None or pd.isna(v) else pd.Timestamp(v).strftime('%Y-%m-%d')
+    if isinstance(v, (np.integer, np.floating)): v = float(v)
+    return '' if v is None else _cell_key(v)
+
+def _conflict(rid, row_id, task, col, mine, theirs):
+    return {'rid': rid, 'Row_ID': row_id, 'task': task, 'col': col, 'mine': mine, 'theirs': theirs}
+
+def _task_label(row): return f"{row['Sub_Task']} ({row['Employee']})"
+
+def _same_content(a, b):
+    # keys สองแถวเท่ากันโดยไม่นับ MERGE_SKIP (คำนวณสถานะใหม่อย่างเดียวไม่นับเป็นการแก้)
+    return all(a[j] == b[j] for j in MERGE_COLS)
+
+def find_conflicts(df, ops):
+    """ช่องที่ผู้ใช้แก้ แต่ระหว่างนั้นมีคนอื่นแก้ช่องเดียวกันเป็นค่าอื่นไปแล้ว (เฉพาะ op 'set' ที่มี base)
+
+    col = None หมายถึงแถวถูกลบไปแล้ว (theirs = ROW_DELETED)
+    """
+    out = []
+    for op, *args in ops:
+        if op != 'set' or len(args) < 3: continue
+        rid, vals, base = args
+        rows = df[df['_rid'] == rid]
+        if rows.empty:
+            out.append(_conflict(rid, None, '', None, None, ROW_DELETED))
+            continue
+        row = rows.iloc[0]
+        for c, v in vals.items():
+            mine, orig, cur = cell_text(c, v), cell_text(c, base.get(c)), cell_text(c, row[c])
+            if mine != orig and cur != orig and cur != mine:
+                out.append(_conflict(rid, row['Row_ID'], _task_label(row), c, v, row[c]))
+    return out
+
+def prefer_mine(ops, conflicts):
+    """ops ชุดเดิมที่ยืนยันใช้ค่าของผู้ใช้ในช่องที่ชนกัน (base = ค่าล่าสุดที่เห็นแล้ว)"""
+    seen = {}
+    for c in conflicts:
+        if c['col']: seen.setdefault(c['rid'], {})[c['col']] = c['theirs']
+    return [(op[0], op[1], op[2], {**op[3], **seen.get(op[1], {})}) if op[0] == 'set' and len(op) > 3 else op
+            for op in ops]
+
+def _merge_list(base, ours, theirs):
+    # รายชื่อ: ลบที่เราลบ + ต่อท้ายที่เราเพิ่ม บนรายชื่อล่าสุดของ backend
+    base = {k[0] for k in base or []}
+    ours_keys = {_cell_key(x) for x in ours}
+    theirs_keys = {_cell_key(x) for x in theirs}
+    removed = base - ours_keys
+    return ([x for x in theirs if _cell_key(x) not in removed]
+            + [x for x in ours if _cell_key(x) not in base and _cell_key(x) not in theirs_keys])
+
+def rebase(ours, base, row_of, theirs, new_ids):
+    """merge การแก้ที่ยังไม่ได้เขียนของเรา (ours เทียบกับ base) เข้ากับข้อมูลล่าสุดใน backend (theirs)
+
+    ours = snapshot (มี _rid), base = keys ของแถวใน backend ตอนซิงก์ล่าสุด, row_of = rid -> ตำแหน่งใน base
+    theirs = df ที่เพิ่งโหลด, new_ids(n) -> rid ใหม่สำหรับแถวที่มีเฉพาะใน theirs
+    คืน (df, pos, conflicts): pos = ตำแหน่งใน theirs ของแต่ละแถว (None = แถวใหม่ของเรา)
+    ช่องที่ชนกันใช้ค่าของ theirs (เขียนก่อนได้ก่อน) แล้วคืนไว้ใน conflicts ให้ผู้ใช้ตัดสิน
+    แก้ชนกับลบ: แถวที่ถูกแก้อยู่ต่อเสมอ แล้วแจ้งเป็น conflict ทั้งแถว (col = None, ฝั่งที่ลบ = ROW_DELETED)
+    """
+    ours_rows, theirs_rows = _to_sheet_rows(ours), _to_sheet_rows(theirs)
+    ours_keys, theirs_keys = _row_keys(ours_rows), _row_keys(theirs_rows)
+    at = {k[ROW_ID]: t for t, k in enumerate(theirs_keys) if k[ROW_ID]}
+    merged = [list(r) for r in theirs_rows]
+    rids = [None] * len(merged)
+    drop, new, conflicts, seen = set(), [], [], set()
+    ours_rids = ours['_rid'].tolist()
+
+    for i, (rid, k) in enumerate(zip(ours_rids, ours_keys)):
+        p = row_of.get(rid)
+        if p is not None: seen.add(p)
+        b, t = (base[p] if p is not None else None), at.get(k[ROW_ID])
+        if t is None:
+            if b is None: new.append(i)
+            elif k != b:   # เราแก้ แต่อีกฝั่งลบแถวไปแล้ว -> ไม่ชุบชีวิตแถวกลับ
+                conflicts.append(_conflict(rid, k[ROW_ID], _task_label(ours.iloc[i]), None, None, ROW_DELETED))
+            continue
+        rids[t] = rid
+        tk = theirs_keys[t]
+        if b is None: b = tk
+        if k == b: continue
+        if tk == b:
+            merged[t] = list(ours_rows[i])
+            continue
+        row = merged[t]
+        for j, c in enumerate(LOG_COLS):
+            if c in MERGE_SKIP or k[j] == b[j] or k[j] == tk[j]: continue
+            if tk[j] == b[j]: row[j] = ours_rows[i][j]
+            elif c == 'Log_Count': row[j] = float(tk[j] or 0) + float(k[j] or 0) - float(b[j] or 0)  # บันทึกของทั้งสองฝั่ง
+            elif c == 'Issue': row[j] = ours_rows[i][j]  # บันทึกล่าสุด; ประวัติทั้งสองฝั่งอยู่ใน Log Book
+            else: conflicts.append(_conflict(rid, k[ROW_ID], _task_label(ours.iloc[i]), c, ours[c].iloc[i], theirs[c].iloc[t]))
+        if _row_keys([row]) != [tk]: row[VERSION] = max(float(k[VERSION] or 0), float(tk[VERSION] or 0) + 1)
+
+    # แถวที่เราลบ: ลบได้ถ้าอีกฝั่งไม่ได้แก้ (ถ้าแก้ -> เก็บไว้ตามอีกฝั่ง แล้วแจ้งให้ผู้ใช้รู้ว่าการลบไม่เกิด)
+    for p in sorted(set(range(len(base))) - seen):
+        t = at.get(base[p][ROW_ID])
+        if t is None: continue
+        if _same_content(theirs_keys[t], base[p]):
+            drop.add(t)
+            continue
+        rids[t] = new_ids(1)[0]
+        conflicts.append(_conflict(rids[t], base[p][ROW_ID], _task_label(theirs.iloc[t]), None, ROW_DELETED, None))
+
+    pos = [t for t in range(len(merged)) if t not in drop]
+    fresh = iter(new_ids(sum(rids[t] is None for t in pos)))
+    df = coerce_logs(pd.DataFrame([merged[t] for t in pos] + [ours_rows[i] for i in new], columns=LOG_COLS))
+    df['_rid'] = [rids[t] if rids[t] is not None else next(fresh) for t in pos] + [ours_rids[i] for i in new]
+    return df, pos + [None] * len(new), conflicts
+
+# ==========================================
+# 9. FISCAL-YEAR ARCHIVE
+# ==========================================
+# ปีงบ = ปีของกำหนดส่ง (เหมือน reports.fiscal_year) ปีที่น้อยกว่าปีปัจจุบันถือว่าปิดแล้ว
+# งานที่เสร็จแล้ว (Progress 100) ของปีที่ปิดถูกย้ายไป partition ของปีนั้นโดย writer thread
+# งานของปีเก่าที่ยังไม่เสร็จอยู่ใน Logs ต่อ (ยังแก้ได้ตามปกติ) จนกว่าจะเสร็จ
+def closed_tasks(df, today):
+    """mask ของงานที่เสร็จแล้วในปีงบที่ปิดแล้ว"""
+    return ((df['Progress'] >= 100).to_numpy() & df['Start_Date'].notna().to_numpy()
+            & (df['End_Date'].dt.year < today.year).to_numpy())
+
+def merge_partition(old, rows):
+    """partition เดิม + งานที่ย้ายเพิ่ม (Row_ID ซ้ำ -> ใช้ค่าใหม่) ย้ายซ้ำจึงไม่เกิดแถวซ้ำ"""
+    df = pd.concat([old, rows.drop(columns=['_rid'], errors='ignore')], ignore_index=True)
+    return coerce_logs(df.drop_duplicates('Row_ID', keep='last').reset_index(drop=True))
+
+# ==========================================
+# 10. SHARED SNAPSHOT
+# ==========================================
+# ข้อมูลชุดเดียวต่อ process ทุก session อ่าน DataFrame เดียวกัน (ห้ามแก้ในที่)
+# การแก้ไขของแต่ละ session เป็น op เล็ก ๆ ซึ่งถูก apply แล้ว publish เป็นเวอร์ชันใหม่ทันที
+# ให้ทุก session เห็นในการ rerun ถัดไป ส่วนการเขียนลง backend ทำโดย writer thread เบื้องหลัง
+#   ('set', rid, {col: val}[, base]) / ('set_many', DataFrame index=rid) / ('add', DataFrame) / ('drop', [rid])
+#   (base = ค่าที่ผู้ใช้เห็นตอนเริ่มแก้ -> เขียนเฉพาะช่องที่ผู้ใช้เปลี่ยนจริง และตรวจ conflict ตอน commit)
+#   ('drop_where', col, val) / ('log', [แถว Log Book]) -> ต่อท้าย Log Book + อัปเดต Issue / Log_Count ของงาน
+#   ('list_add', 'employees'|'projects', val) / ('list_remove', ..., val)
+Snapshot = namedtuple('Snapshot', 'version logs employees projects day')
+LOAD_TTL = 60  # วินาที: เช็คว่า backend ถูกแก้จากที่อื่นไหมอย่างมากทุก ๆ เท่านี้
+
+def _set_values(df, mask, vals):
+    for c, v in vals.items():
+        if c in DATE_COLS: v = pd.Timestamp(v).normalize() if v is not None and v == v else pd.NaT
+        elif isinstance(df[c].dtype, pd.CategoricalDtype) and v not in df[c].cat.categories:
+            df[c] = df[c].cat.add_categories([v])
+        df.loc[mask, c] = v
+
+def _set_rows(df, upd):
+    """แก้หลายแถวในครั้งเดียว: upd มี index = rid และคอลัมน์ = ค่าใหม่"""
+    mask = df['_rid'].isin(upd.index)
+    rids = df.loc[mask, '_rid']
+    for c in upd.columns:
+        v = upd[c].reindex(rids)
+        if c in DATE_COLS: v = pd.to_datetime(v).dt.normalize()
+        elif isinstance(df[c].dtype, pd.CategoricalDtype):
+            new = v.dropna().unique()
+            new = [x for x in new if x not in df[c].cat.categories]
+            if new: df[c] = df[c].cat.add_categories(new)
+        df.loc[mask, c] = v.to_numpy()
+
+def apply_ops(snap, ops):
+    df = snap.logs.copy()
+    lists = {'employees': list(snap.employees), 'projects': list(snap.projects)}
+    for op, *args in ops:
+        if op == 'set':
+            rid, vals, *base = args
+            if base: vals = {c: v for c, v in vals.items() if cell_text(c, v) != cell_text(c, base[0].get(c))}
+            mask = df['_rid'] == rid
+            _set_values(df, mask, vals)
+            if vals: df.loc[mask, 'Version'] += 1
+        elif op == 'set_many':
+            _set_rows(df, args[0])
+            df.loc[df['_rid'].isin(args[0].index), 'Version'] += 1
+        elif op == 'log':
+            for row in args[0]:
+                mask = np.ones(len(df), dtype=bool)
+                for c, v in zip(TASK_KEY, row): mask &= (df[c] == v).to_numpy()
+                df.loc[mask, 'Issue'] = row[-1]
+                df.loc[mask, 'Log_Count'] += 1
+                df.loc[mask, 'Version'] += 1
+        elif op == 'add':
+            new = coerce_logs(args[0].copy())
+            assign_row_ids(new)
+            new['Version'] = new['Version'].clip(lower=1)
+            df = pd.concat([df, new], ignore_index=True)
+            # category ต่างชุดกัน concat แล้วจะกลายเป็น object -> แปลงกลับ
+            for col in CATEGORY_COLS:
+                if not isinstance(df[col].dtype, pd.CategoricalDtype): df[col] = df[col].astype('category')
+        elif op == 'drop': df = df[~df['_rid'].isin(args[0])]
+        elif op == 'drop_where': df = df[df[args[0]] != args[1]]
+        elif op == 'list_add':
+            if args[1] not in lists[args[0]]: lists[args[0]].append(args[1])
+        elif op == 'list_remove':
+            if args[1] in lists[args[0]]: lists[args[0]].remove(args[1])
+    return df.reset_index(drop=True), lists['employees'], lists['projects']
+
+class DataStore:
+    def __init__(self, backend, prepare=None, summarize=None):
+        # prepare(df) -> df: คำนวณคอลัมน์ที่ได้จากข้อมูล (สถานะ/คะแนน) ครั้งเดียวต่อเวอร์ชัน
+        # summarize(df) -> ผลรวมต่อ (ปี, พนักงาน) ตาม ARCHIVE_SUMMARY_COLS; ไม่ระบุ = ไม่ย้ายงานไป archive
+        self.backend = backend
+        self.prepare = prepare or (lambda df: df)
+        self.summarize = summarize
+        self.lock = threading.RLock()
+        self.snap = None
+        self.synced = {}         # ค่าที่อยู่ใน backend จริง ({} = ยังโหลดไม่สำเร็จ)
+        self.row_of = {}         # rid -> ตำแหน่งแถวใน backend ตาม synced
+        self.load_error = None
+        self.load_failures = 0   # โหลดไม่สำเร็จติดกันกี่ครั้ง
+        self.retry_load_at = 0.0 # time.monotonic() ที่ลองโหลดใหม่ได้ (backoff หลังโหลดไม่สำเร็จ)
+        self._ids = itertools.count()
+        self.revision = None     # backend.revision() ตอนโหลดครั้งล่าสุด
+        self.checked_at = 0.0    # time.monotonic() ที่เช็ค revision ล่าสุด
+        self.conflicts = {}      # Row_ID -> ช่องที่ชนกันตอน rebase (ใช้ค่าของอีกฝั่งไว้ก่อน รอผู้ใช้ตัดสิน)
+
+        # archive: ผลรวมของปีที่ปิดแล้วโหลดทุกครั้งที่ reload ส่วนงานของปีนั้นโหลดเมื่อมีคนเปิดดู
+        self.archive_sums = summary_frame([])
+        self.archive_version = 0
+        self.archive_due = False # มีงานที่ต้องย้ายไป archive (writer ทำในรอบถัดไป)
+        self.archive_error = None  # error ของการย้ายครั้งล่าสุด (แยกจากการบันทึกของผู้ใช้)
+        self._archived = {}      # ปี -> งานใน partition (แคชร่วมทุก session)
+        self.purge_queue = []    # (col, val) ของ drop_where ที่ต้องลบออกจาก partition ด้วย (writer ทำรอบถัดไป)
+
+        # write-behind
+        self.dirty_version = 0   # เวอร์ชันล่าสุดที่มีการแก้ไขจากผู้ใช้
+        self.flushed_version = 0 # เวอร์ชันล่าสุดที่เขียนลง backend แล้ว
+        self.log_queue = []      # แถว Log Book ที่รอต่อท้ายใน backend (เขียนก่อนตาราง Logs)
+        self.log_lock = threading.Lock()  # การต่อท้าย Log Book ใน backend ไม่แทรกระหว่างการอ่านประวัติ
+        self._history = None     # ประวัติทุกงาน (_index_history) โหลดครั้งเดียว แล้วต่อท้ายเองตอน commit
+        self.writer = Flusher(self._flush, name="sheet-writer")
+
+    @property
+    def loaded(self):
+        return self.snap is not None and bool(self.synced)
+
+    @property
+    def pending(self):
+        return self.dirty_version > self.flushed_version
+
+    def new_ids(self, n):
+        with self.lock: return [next(self._ids) for _ in range(n)]
+
+    def _publish(self, df, employees, projects):
+        if '_rid' not in df.columns: df['_rid'] = self.new_ids(len(df))
+        version = self.snap.version + 1 if self.snap else 1
+        self.snap = Snapshot(version, self.prepare(df), tuple(employees), tuple(projects), date.today())
+
+    def _revision(self):
+        with metrics.timer('store', op='revision'): return self.backend.revision()
+
+    def reload(self, rev=None):
+        with self.lock:
+            if rev is None: rev = self._revision()
+            try:
+                with metrics.timer('store', op='load'): logs, emps, projs, synced = self.backend.load()
+                self._load_archive_sums()
+            except Exception as e:
+                print(f"Load Error: {e}")
+                self.load_error = e
+                self.load_failures += 1
+                self.retry_load_at = time.monotonic() + min(FLUSH_BACKOFF_MAX, 2 ** self.load_failures)
+                if self.snap is None: self._publish(logs_frame([]), [], [])
+                return self.snap
+            legacy = split_issue_blobs(logs)
+            migrated = assign_row_ids(logs)
+            self._publish(logs, emps, projs)
+            self.synced = synced
+            self.load_error, self.load_failures, self.retry_load_at = None, 0, 0.0
+            self.row_of = {rid: i for i, rid in enumerate(self.snap.logs['_rid'])}
+            self.dirty_version = self.flushed_version = self.snap.version
+            self._rekey_conflicts()
+            self._history = None  # อาจมีบันทึกจากที่อื่น -> โหลดประวัติใหม่เมื่อมีคนเปิดดู
+            if legacy or migrated:
+                # ย้าย Issue แบบเดิมไป Log Book / ใส่ Row_ID ครั้งเดียว แล้วเขียนแถวที่แปลงแล้วกลับ
+                self.log_queue += legacy
+                self.flushed_version = 0
+                self.writer.kick()
+            self._schedule_archive()
+            self.revision, self.checked_at = rev, time.monotonic()
+            return self.snap
+
+    def refresh(self, max_age=0):
+        """โหลดใหม่เฉพาะเมื่อข้อมูลใน backend เปลี่ยน คืน True ถ้ามีการโหลดจริง"""
+        # ต้องเขียนของที่ค้างให้เสร็จก่อน ไม่งั้นการโหลดใหม่จะทับการแก้ไขที่ยังไม่ได้บันทึก
+        if self.pending and not self.flush(): return False
+        with self.lock:
+            if time.monotonic() - self.checked_at < max_age or self.pending: return False
+            rev = self._revision()
+            if rev is not None and self.loaded:
+                if self._unchanged(rev):
+                    self.revision, self.checked_at = rev, time.monotonic()
+                    return False
+            self.reload(rev)
+            return True
+
+    def snapshot(self):
+        if not self.loaded:
+            metrics.lookup('snapshot', hit=False)
+            # โหลดไม่สำเร็จ (เช่น 429): ไม่โหลดทั้งชุดซ้ำทุก rerun ของทุก session รอ backoff ก่อน
+            # session ที่รอ lock อยู่ระหว่างที่อีก session โหลดได้ผลของรอบนั้นไปเลย
+            with self.lock:
+                if self.loaded or time.monotonic() < self.retry_load_at: return self.snap
+                return self.reload()
+        reloaded = time.monotonic() - self.checked_at > LOAD_TTL and not self.pending and self.refresh(max_age=LOAD_TTL)
+        metrics.lookup('snapshot', hit=not reloaded)
+        if self.snap.day != date.today():
+            # ขึ้นวันใหม่ สถานะ (ล่าช้า / ยังไม่เริ่ม) เปลี่ยน -> คำนวณใหม่ครั้งเดียวให้ทุก session
+            with self.lock:
+                if self.snap.day != date.today():
+                    s = self.snap
+                    self._publish(s.logs.copy(), s.employees, s.projects)
+                    self._schedule_archive()
+        return self.snap
+
+    def commit(self, ops):
+        with self.lock:
+            if not self.loaded: raise RuntimeError("ยังโหลดข้อมูลไม่สำเร็จ")
+            conflicts = find_conflicts(self.snap.logs, ops)
+            if conflicts:
+                metrics.inc('store_conflicts', len(conflicts), stage='commit')
+                raise WriteConflict(conflicts)
+            self._publish(*apply_ops(self.snap, ops))
+            log_rows = [row for op in ops if op[0] == 'log' for row in op[1]]
+            self.log_queue += log_rows
+            if self._history is not None: _index_history(self._history, log_rows)
+            self.dirty_version = self.snap.version
+            purges = [op[1:] for op in ops if op[0] == 'drop_where']
+            if purges and self.summarize: self._purge_archive(purges)
+        self.writer.kick()
+        return self.snap
+
+    def _flush(self):
+        with self.lock:
+            if not self.pending: return
+            log_rows = list(self.log_queue)
+        # เช็คก่อนเขียนอะไรทั้งนั้น: หลังเราเขียนเอง written_revision จะกลบการแก้ของคนอื่นที่มาก่อนหน้า
+        rev = self._revision()
+        stale = self._changed_elsewhere(rev)
+        if log_rows:
+            with self.log_lock:
+                with metrics.timer('store', op='append_log'): self.backend.append_log(log_rows)
+                with self.lock: del self.log_queue[:len(log_rows)]
+        # เขียนทับเฉพาะเมื่อ backend ยังเป็นชุดที่เราซิงก์ไว้ ไม่งั้น merge ข้อมูลล่าสุดก่อน
+        if stale: self._rebase(rev)
+        self._write()
+        if self.archive_due: self._flush_archive()
+
+    def _write(self):
+        try: self._save()
+        except StaleWrite:
+            # มีคนเขียนแทรกระหว่างเช็ค revision กับตอนเขียน (backend ที่เขียนแบบมีเงื่อนไขได้)
+            self._rebase(self._revision())
+            self._save()
+
+    def _flush_archive(self):
+        # หลังการแก้ของผู้ใช้ลง backend แล้วเท่านั้น: archive ล้มไม่ขวางการบันทึก / การโหลดใหม่ (ลองใหม่รอบหน้า)
+        rev = self._revision()
+        if self._changed_elsewhere(rev): self._rebase(rev)
+        try: moved = self._archive()
+        except Exception as e:
+            print(f"Archive Error: {e}")
+            metrics.inc('store_errors', writer='archive')
+            self.archive_error = e
+            return
+        self.archive_error = None
+        if moved: self._write()
+
+    def _unchanged(self, rev):
+        # ตรงกับตอนโหลด หรือกับการเขียนครั้งล่าสุดของเราเองพอดี (ไม่ใช้ช่วงเวลาเผื่อ: คนอื่นเขียนตามหลังไม่กี่วิก็ต้องเห็น)
+        return rev == self.revision or (self.revision is not None and rev == self.backend.written_revision())
+
+    def _changed_elsewhere(self, rev):
+        if rev is None or self.revision is None or self.synced.get('Logs') is None: return False
+        if self._unchanged(rev):
+            self.revision = rev
+            return False
+        return True
+
+    def _rebase(self, rev):
+        """backend ถูกแก้จากที่อื่น: โหลดชุดล่าสุดแล้ว merge การแก้ที่ยังไม่ได้เขียนของเราเข้าไป"""
+        with metrics.timer('store', op='load'): theirs, emps, projs, synced = self.backend.load()
+        assign_row_ids(theirs)
+        self._load_archive_sums()
+        with self.lock:
+            s, base = self.snap, self.synced
+            df, pos, conflicts = rebase(s.logs, base['Logs'], self.row_of, theirs, self.new_ids)
+            self._publish(df, _merge_list(base.get('Employees'), s.employees, emps),
+                          _merge_list(base.get('Projects'), s.projects, projs))
+            self.synced = synced
+            self.row_of = {rid: p for rid, p in zip(df['_rid'], pos) if p is not None}
+            self._history = None
+            self.dirty_version = self.snap.version
+            self.revision, self.checked_at = rev, time.monotonic()
+            self._rekey_conflicts()
+            for c in conflicts: self.conflicts.setdefault(c['Row_ID'], []).append(c)
+        metrics.inc('store_rebases')
+        if conflicts: metrics.inc('store_conflicts', len(conflicts), stage='rebase')
+
+    def _rekey_conflicts(self):
+        # _rid ของแถวเปลี่ยนทุกครั้งที่โหลดใหม่ -> ชี้ conflict ที่ค้างไปที่แถวเดิมตาม Row_ID
+        rids = dict(zip(self.snap.logs['Row_ID'], self.snap.logs['_rid']))
+        for row_id, cs in self.conflicts.items():
+            if row_id in rids: cs[:] = [{**c, 'rid': rids[row_id]} for c in cs]
+
+    def lost_edits(self):
+        """conflict ของงานที่ถูกลบไปแล้ว (เปิดจากหน้าอัพเดตไม่ได้) -> {Row_ID: ชื่องาน}"""
+        with self.lock:
+            live = set(self.snap.logs['Row_ID']) if self.snap is not None else set()
+            return {k: cs[0]['task'] for k, cs in self.conflicts.items() if k not in live}
+
+    def resolve(self, row_id):
+        """ผู้ใช้ตัดสิน conflict ของแถวนี้แล้ว"""
+        with self.lock: self.conflicts.pop(row_id, None)
+
+    def _save(self):
+        with self.lock:
+            snap, synced = self.snap, self.synced
+            log_pos = [self.row_of.get(rid) for rid in snap.logs['_rid']]
+        with metrics.timer('store', op='save'):
+            new_synced = self.backend.save(snap.logs, snap.employees, snap.projects, synced, log_pos)
+        with self.lock:
+            self.synced = new_synced
+            self.row_of = {rid: i for i, rid in enumerate(snap.logs['_rid'])}
+            self.flushed_version = snap.version
+
+    def _load_archive_sums(self):
+        if not self.summarize: return
+        with metrics.timer('store', op='archive_summary'): sums = self.backend.archive_summary()
+        with self.lock:
+            if sums.equals(self.archive_sums): return
+            self.archive_sums, self._archived = sums, {}
+            self.archive_version += 1
+
+    def _purge_archive(self, purges):
+        # ลบพนักงาน / โปรเจกต์ -> งานของปีที่เก็บถาวรหายไปด้วย: ตัดจากผลรวม / แคชทันที แล้วให้ writer เขียน partition ทับ
+        for col, val in purges:
+            if col in self.archive_sums: self.archive_sums = self.archive_sums[self.archive_sums[col] != val].reset_index(drop=True)
+            self._archived = {y: df[df[col] != val].reset_index(drop=True) for y, df in self._archived.items()}
+        self.purge_queue += purges
+        self.archive_version += 1
+        self.archive_due = True
+
+    def _schedule_archive(self):
+        # มีงานที่ควรย้าย -> ให้ writer ทำเบื้องหลัง (session ไม่ต้องรอ)
+        if not self.summarize or not closed_tasks(self.snap.logs, self.snap.day).any(): return
+        self.archive_due = True
+        self.flushed_version = 0
+        self.writer.kick()
+
+    def _archive(self):
+        """ย้ายงานที่เสร็จแล้วของปีที่ปิดไป partition ของปีนั้น แล้วลบออกจาก snapshot (_save ลบออกจาก Logs ต่อ)
+
+        งานของพนักงาน / โปรเจกต์ที่ถูกลบ (purge_queue) ถูกตัดออกจาก partition ทุกปีในรอบเดียวกัน
+        คืน True ถ้ามีแถวถูกลบออกจาก snapshot (ต้องเขียน Logs อีกรอบ)
+
+        เขียน partition ก่อนลบเสมอ: ล้มกลางทาง -> งานยังอยู่ใน Logs และรอบหน้าเขียน partition ทับด้วยชุดเดิม
+        """
+        with self.lock:
+            logs = self.snap.logs
+            done = logs[closed_tasks(logs, self.snap.day)]
+            live = set(logs['Row_ID'])
+            purges = list(self.purge_queue)
+        years = {int(y) for y in done['End_Date'].dt.year}
+        if purges: years |= set(self.backend.archive_summary()['Year'])  # ผลรวมใน memory ถูกตัดไปแล้ว
+        parts, sums = {}, {}
+        for year in sorted(years):
+            rows = done[done['End_Date'].dt.year == year]
+            with metrics.timer('store', op='archive'):
+                old = self.backend.load_archive(year)
+                # งานที่ยังอยู่ใน Logs (ถูกเปิดกลับมาแก้หลังรอบก่อน) และงานของพนักงาน / โปรเจกต์ที่ถูกลบ ไม่ค้างอยู่ใน partition
+                gone = old['Row_ID'].isin(live)
+                for col, val in purges: gone |= old[col] == val
+                if rows.empty and not gone.any(): continue
+                parts[year] = merge_partition(old[~gone], rows)
+                sums[year] = self.summarize(parts[year])
+                self.backend.save_archive(year, parts[year], sums[year])
+            metrics.inc('archived_rows', len(rows))
+        with self.lock:
+            # แถวที่ถูกแก้ระหว่างเขียน partition (Version เปลี่ยน) ยังอยู่ใน Logs รอย้ายรอบหน้าด้วยค่าล่าสุด
+            moved = set(zip(done['Row_ID'], done['Version']))
+            cur = self.snap.logs
+            hit = [k in moved for k in zip(cur['Row_ID'], cur['Version'])]
+            drop = cur.loc[hit, '_rid'].tolist()
+            kept = done[~done['Row_ID'].isin(cur.loc[hit, 'Row_ID'])]
+            if drop:
+                self._publish(*apply_ops(self.snap, [('drop', drop)]))
+                self.dirty_version = self.snap.version
+            # ...จึงเอาออกจาก partition / ผลรวมด้วย ไม่งั้นนับซ้ำกับแถวใน Logs
+            redo = sorted({int(y) for y in kept['End_Date'].dt.year})
+            for year in redo:
+                parts[year] = parts[year][~parts[year]['Row_ID'].isin(kept['Row_ID'])].reset_index(drop=True)
+                sums[year] = self.summarize(parts[year])
+            # ผลรวมเปลี่ยนพร้อมกับที่แถวหายจาก snapshot -> ตารางผลงานไม่นับซ้ำ
+            keep = self.archive_sums[~self.archive_sums['Year'].isin(list(sums))]
+            self.archive_sums = summary_frame(pd.concat([keep, *sums.values()], ignore_index=True))
+            for year in sums: self._archived.pop(year, None)
+            self.archive_version += 1
+            self.archive_due = False
+            del self.purge_queue[:len(purges)]
+        for year in redo:
+            # ล้มตรงนี้ -> partition ยังมีแถวเกินจนกว่าจะย้ายปีนั้นรอบหน้า (ตัดแถวที่อยู่ใน Logs ออกให้เอง)
+            with metrics.timer('store', op='archive'): self.backend.save_archive(year, parts[year], sums[year])
+            with self.lock:
+                self._archived.pop(year, None)
+                self.archive_version += 1
+        return bool(drop)
+
+    def archive_state(self):
+        """(ผลรวมของปีที่เก็บถาวร, เวอร์ชัน) เวอร์ชันเปลี่ยนทุกครั้งที่ผลรวมเปลี่ยน"""
+        with self.lock: return self.archive_sums, self.archive_version
+
+    def archived(self, year):
+        """งานของปีที่เก็บถาวร: โหลดจาก backend ครั้งแรกที่มีคนเปิดดู แล้วใช้ร่วมกันทุก session"""
+        with self.lock: df = self._archived.get(year)
+        metrics.lookup('archive', hit=df is not None)
+        if df is None:
+            with self.lock: version = self.archive_version
+            with metrics.timer('store', op='load_archive'): df = self.backend.load_archive(year)
+            with self.lock:
+                if version == self.archive_version: self._archived[year] = df
+        return df
+
+    def history(self, employee, project, sub):
+        """ประวัติ Log Book ของงาน รวมบันทึกที่ยังรอเขียน
+
+        backend ที่ค้นรายงานได้เอง (SQLite) ถามทีละงาน; ที่เหลือ (Sheets) โหลดทั้งตารางครั้งเดียวต่อ process
+        แล้วต่อท้ายเองตอน commit ไม่ดาวน์โหลดทั้งชีตทุกครั้งที่เปิด dialog
+        """
+        with self.log_lock:
+            if self.backend.history_indexed:
+                with metrics.timer('store', op='log_history'): rows = self.backend.log_history(employee, project, sub)
+                with self.lock: return rows + _history(self.log_queue, employee, project, sub)
+            with self.lock: index = self._history
+            metrics.lookup('logbook', hit=index is not None)
+            if index is None:
+                with metrics.timer('store', op='load_logbook'): rows = self.backend.logbook_rows()
+                with self.lock: index = self._history = _index_history({}, rows + self.log_queue)
+            with self.lock: return list(index.get(tuple(_cell_key(x) for x in (employee, project, sub)), []))
+
+    def flush(self):
+        """เขียนทุกอย่างที่ค้างลง backend ทันที คืน False ถ้าเขียนไม่สำเร็จ"""
+        return self.writer.run_once()
+
+    def close(self):
+        self.writer.close()
+        self.backend.close()
+
+    def sync_state(self):
+        state = self.writer.state(self.pending)
+        if state[0] == 'synced': return self.backend.sync_state() or state
+        return state
@@ -0,0 +1,115 @@
+"""กราฟงานต่อเนื่อง (คอลัมน์ Dependency) ของ Project Tracker
+
+โหนด = (โปรเจกต์, ชื่องาน) ซึ่งอาจมีหลายแถว (ผู้รับผิดชอบหลายคน)
+เส้นเชื่อม = งานที่ระบุใน Dependency -> งานที่รอ ภายในโปรเจกต์เดียวกัน
+สร้างครั้งเดียวต่อเวอร์ชันข้อมูล แล้วค้นหาแบบ dict ได้ทันทีโดยไม่ต้องสแกน DataFrame
+"""
+from collections import defaultdict, deque
+
+import numpy as np
+import pandas as pd
+
+NO_DEPENDENCY = ("- เริ่มใหม่ -", "- เริ่มต้นใหม่ (ไม่รอใคร) -")
+ONE_DAY = pd.Timedelta(days=1)
+
+class TaskGraph:
+    def __init__(self, df):
+        keys = df.groupby(['Main_Task', 'Sub_Task'], observed=True, sort=False)
+        self.rows = keys.indices                       # (โปรเจกต์, งาน) -> ตำแหน่งแถวใน df
+        self.rids = df['_rid'].to_numpy() if '_rid' in df else np.arange(len(df))
+        self.start_dates = df['Start_Date'].to_numpy()
+        self.end_dates = df['End_Date'].to_numpy()
+
+        span = keys.agg(Start=('Start_Date', 'min'), End=('End_Date', 'max'))
+        self.start = span['Start'].to_dict()
+        self.end = span['End'].to_dict()
+
+        # ตัวเลือก "รอต่องานไหน?": งานในโปรเจกต์เรียงกำหนดส่งล่าสุดก่อน
+        self.by_project = defaultdict(list)
+        for p, sub in span.sort_values('End', ascending=False).index: self.by_project[p].append(sub)
+
+        self.preds = defaultdict(set)
+        self.succs = defaultdict(set)
+        edges = df[['Main_Task', 'Dependency', 'Sub_Task']].dropna().drop_duplicates()
+        edges = edges[~edges['Dependency'].isin(NO_DEPENDENCY)]
+        for p, dep, sub in edges.itertuples(index=False):
+            if dep != sub and (p, dep) in self.rows:
+                self.preds[(p, sub)].add((p, dep))
+                self.succs[(p, dep)].add((p, sub))
+
+    def tasks(self, project): return self.by_project.get(project, [])
+
+    def end_of(self, project, sub): return self.end.get((project, sub), pd.NaT)
+
+    def predecessors(self, project, sub): return self.preds.get((project, sub), set())
+
+    def downstream(self, project, sub):
+        """งานทั้งหมดที่รอ (ทางตรงและทางอ้อม) งานนี้"""
+        seen, todo = set(), deque([(project, sub)])
+        while todo:
+            for n in self.succs.get(todo.popleft(), ()):
+                if n not in seen:
+                    seen.add(n)
+                    todo.append(n)
+        return seen
+
+    def _topo(self, nodes):
+        """เรียงโหนดตามลำดับก่อน-หลัง (Kahn) โหนดที่อยู่ในวงวนจะถูกข้าม"""
+        nodes = set(nodes)
+        indeg = {n: len(self.preds.get(n, set()) & nodes) for n in nodes}
+        todo = deque(n for n, d in indeg.items() if d == 0)
+        while todo:
+            n = todo.popleft()
+            yield n
+            for m in self.succs.get(n, ()):
+                if m in indeg:
+                    indeg[m] -= 1
+                    if indeg[m] == 0: todo.append(m)
+
+    def _days(self, n):
+        s, e = self.start.get(n), self.end.get(n)
+        return (e - s).days + 1 if pd.notna(s) and pd.notna(e) and e >= s else 0
+
+    def critical_path(self, project):
+        """สายงานที่ยาวที่สุดของโปรเจกต์ (ผลรวมจำนวนวันตามลำดับ Dependency)
+
+        คืนค่า (รายชื่องานตามลำดับ, จำนวนวันรวม)
+        """
+        finish, via = {}, {}
+        for n in self._topo((project, s) for s in self.tasks(project)):
+            prev = max(self.preds.get(n, ()), key=lambda q: finish.get(q, -1), default=None)
+            finish[n] = finish.get(prev, 0) + self._days(n)
+            via[n] = prev
+        if not finish: return [], 0
+        n = max(finish, key=finish.get)
+        total, path = finish[n], []
+        while n is not None:
+            path.append(n[1])
+            n = via.get(n)
+        return path[::-1], total
+
+    def shift_plan(self, project, sub, end):
+        """เลื่อนงานปลายน้ำเมื่องานนี้จะจบวัน `end`
+
+        งานที่เริ่มก่อนงานที่รออยู่เสร็จจะถูกเลื่อนทั้งช่วง (คงระยะเวลาเดิม) ต่อเนื่องไปตามกราฟ
+        คืน DataFrame (index = _rid, คอลัมน์ Start_Date/End_Date) สำหรับ op 'set_many'
+        """
+        root = (project, sub)
+        new_end = {root: pd.Timestamp(end)}
+        shifted = []
+        for n in self._topo(self.downstream(project, sub) | {root}):
+            if n == root: continue
+            ends = [new_end.get(q, self.end.get(q)) for q in self.preds.get(n, ())]
+            ends = [e for e in ends if pd.notna(e)]
+            start = self.start.get(n)
+            delta = max(ends) + ONE_DAY - start if ends and pd.notna(start) else pd.Timedelta(0)
+            if delta > pd.Timedelta(0):
+                shifted.append((n, delta))
+                new_end[n] = self.end[n] + delta
+            else: new_end[n] = self.end.get(n)
+
+        if not shifted: return pd.DataFrame(columns=['Start_Date', 'End_Date'])
+        pos = np.concatenate([self.rows[n] for n, _ in shifted])
+        delta = np.repeat([d.to_timedelta64() for _, d in shifted], [len(self.rows[n]) for n, _ in shifted])
+        return pd.DataFrame({'Start_Date': self.start_dates[pos] + delta, 'End_Date': self.end_dates[pos] + delta},
+                            index=pd.Index(self.rids[pos], name='_rid'))
@@ -0,0 +1,83 @@
+"""ย้ายงานของปีที่ปิดแล้วไป archive (writer ทำหลังบันทึกการแก้ของผู้ใช้)"""
+from datetime import date
+
+import reports
+import scoring
+import storage
+
+YEAR = date.today().year
+TABLES = {
+    'Logs': [storage.LOG_COLS[:12],
+             ['A', 'P', 'old', f"{YEAR - 1}-01-01", f"{YEAR - 1}-02-01", '', '', 0, '- เริ่มใหม่ -', 100, 0, ''],
+             ['A', 'P', 'cur', f"{YEAR}-01-01", f"{YEAR}-02-01", '', '', 0, '- เริ่มใหม่ -', 0, 0, '']],
+    'Employees': [['Name'], ['A']],
+    'Projects': [['Project'], ['P']],
+}
+
+class BrokenArchive(storage.MemoryBackend):
+    def save_archive(self, year, df, summary): raise RuntimeError("archive down")
+
+class ReopenDuringArchive(storage.MemoryBackend):
+    # มีคนเปิดงานกลับมาแก้ระหว่างที่ writer เขียน partition
+    store = None
+
+    def save_archive(self, year, df, summary):
+        super().save_archive(year, df, summary)
+        st, self.store = self.store, None
+        if st is not None:
+            rid = st.snap.logs.loc[st.snap.logs['Sub_Task'] == 'old', '_rid'].iloc[0]
+            st.commit([('set', rid, {'Progress': 50})])
+
+def open_store(backend):
+    st = storage.DataStore(backend, prepare=scoring.calculate_status_and_score, summarize=reports.year_sums)
+    st.snapshot()
+    return st
+
+def test_archive_moves_closed_tasks():
+    backend = storage.MemoryBackend(TABLES)
+    st = open_store(backend)
+    assert st.archive_due and st.flush()
+    assert st.snap.logs['Sub_Task'].tolist() == ['cur']
+    assert st.archived(YEAR - 1)['Sub_Task'].tolist() == ['old']
+    assert [r[2] for r in backend.tables['Logs'][1:]] == ['cur']
+
+def test_archive_error_does_not_block_user_edits():
+    backend = BrokenArchive(TABLES)
+    st = open_store(backend)
+    rid = st.snap.logs.loc[st.snap.logs['Sub_Task'] == 'cur', '_rid'].iloc[0]
+    st.commit([('set', rid, {'Output': 'done'})])
+    assert st.flush()
+    assert not st.pending
+    assert str(st.archive_error) == "archive down"
+    saved = {r[2]: r[5] for r in backend.tables['Logs'][1:]}
+    assert saved == {'old': '', 'cur': 'done'}
+    assert st.archive_due  # ลองย้ายใหม่รอบหน้า
+
+def test_task_edited_during_archive_is_not_counted_twice():
+    backend = ReopenDuringArchive(TABLES)
+    st = open_store(backend)
+    backend.store = st
+    assert st.flush()
+    assert sorted(st.snap.logs['Sub_Task']) == ['cur', 'old']
+    assert st.archived(YEAR - 1).empty
+    assert backend.load_archive(YEAR - 1).empty
+    sums, _ = st.archive_state()
+    assert sums[sums['Year'] == YEAR - 1]['Total'].sum() == 0
+
+def test_deleting_employee_purges_archive():
+    tables = {**TABLES, 'Logs': TABLES['Logs'] + [
+        ['B', 'P', 'b-old', f"{YEAR - 2}-01-01", f"{YEAR - 2}-02-01", '', '', 0, '- เริ่มใหม่ -', 100, 0, '']],
+        'Employees': [['Name'], ['A'], ['B']]}
+    backend = storage.MemoryBackend(tables)
+    st = open_store(backend)
+    assert st.flush()
+    assert st.archived(YEAR - 2)['Sub_Task'].tolist() == ['b-old']
+
+    st.commit([('list_remove', 'employees', 'B'), ('drop_where', 'Employee', 'B')])
+    sums, _ = st.archive_state()
+    assert 'B' not in set(sums['Employee'])  # ตารางผลงานไม่นับทันที ก่อน writer เขียน
+    assert st.flush()
+    assert st.archived(YEAR - 2).empty and backend.load_archive(YEAR - 2).empty
+    assert set(backend.archive_summary()['Employee']) == {'A'}
+    assert st.archived(YEAR - 1)['Sub_Task'].tolist() == ['old']
+    assert st.purge_queue == []
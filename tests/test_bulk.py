@@ -0,0 +1,59 @@
+"""นำเข้างานจากไฟล์: ตรวจทีละแถว และไม่ commit อะไรถ้าไฟล์เสียกลางทาง"""
+import io
+
+import pandas as pd
+import pytest
+
+import bulk
+
+HEADER = "Employee,Main_Task,Sub_Task,Start_Date,End_Date,Progress\n"
+
+def chunk(rows):
+    cols = ['Employee', 'Main_Task', 'Sub_Task', 'Start_Date', 'End_Date', 'Progress']
+    return pd.DataFrame(rows, columns=cols, index=range(2, len(rows) + 2))
+
+@pytest.mark.parametrize('row, error', [
+    (['Z', 'P', 't', '2025-01-01', '2025-01-02', ''], "ไม่รู้จักพนักงาน"),
+    (['A', 'Q', 't', '2025-01-01', '2025-01-02', ''], "ไม่รู้จักโปรเจกต์"),
+    (['A', 'P', '', '2025-01-01', '2025-01-02', ''], "ไม่มีชื่องาน"),
+    (['A', 'P', 't', '01/02/2025', '2025-01-02', ''], "วันเริ่มไม่ถูกต้อง (YYYY-MM-DD)"),
+    (['A', 'P', 't', '2025-01-01', '', ''], "กำหนดส่งไม่ถูกต้อง (YYYY-MM-DD)"),
+    (['A', 'P', 't', '2025-02-01', '2025-01-02', ''], "วันเริ่มอยู่หลังกำหนดส่ง"),
+    (['A', 'P', 't', '2025-01-01', '2025-01-02', '101'], "ความคืบหน้าต้องเป็น 0-100"),
+    (['A', 'P', 't', '2025-01-01', '2025-01-02', '-1'], "ความคืบหน้าต้องเป็น 0-100"),
+    (['A', 'P', 't', '2025-01-01', '2025-01-02', 'x'], "ความคืบหน้าต้องเป็น 0-100"),
+])
+def test_validate_rejects(row, error):
+    good, bad = bulk.validate(chunk([row]), {'A'}, {'P'})
+    assert good.empty
+    assert bad == [(2, error)]
+
+def test_validate_accepts_and_fills_defaults():
+    good, bad = bulk.validate(chunk([['A', 'P', 't', '2025-01-01', '2025-01-01', '']]), {'A'}, {'P'})
+    assert bad == []
+    row = good.iloc[0]
+    assert (row['Progress'], row['Dependency'], row['End_Date']) == (0, bulk.NEW_TASK, pd.Timestamp('2025-01-01'))
+
+def run(text, **kw):
+    commits = []
+    res = bulk.import_tasks(io.BytesIO(text.encode()), 'tasks.csv', ['A'], ['P'], commits.append,
+                            lambda n: list(range(n)), **kw)
+    return res, commits
+
+def test_import_reports_errors_and_commits_in_batches():
+    text = HEADER + "A,P,t1,2025-01-01,2025-01-02,0\n" * 5 + "Z,P,t2,2025-01-01,2025-01-02,0\n"
+    res, commits = run(text, chunk=2, batch=2)
+    assert (res.rows, res.added, res.errors) == (6, 5, [(7, "ไม่รู้จักพนักงาน")])
+    assert [len(ops[0][1]) for ops in commits] == [2, 2, 1]
+
+def test_read_error_part_way_commits_nothing():
+    text = HEADER + "A,P,t1,2025-01-01,2025-01-02,0\n" * 5 + "A,P,t1,2025-01-01,2025-01-02,0,extra,cols\n"
+    commits = []
+    with pytest.raises(pd.errors.ParserError):
+        bulk.import_tasks(io.BytesIO(text.encode()), 'tasks.csv', ['A'], ['P'], commits.append,
+                          lambda n: list(range(n)), chunk=2, batch=2)
+    assert commits == []
+
+def test_missing_columns():
+    with pytest.raises(ValueError, match="End_Date"):
+        run("Employee,Main_Task,Sub_Task,Start_Date\nA,P,t,2025-01-01\n")
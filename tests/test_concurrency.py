@@ -0,0 +1,130 @@
+"""สอง process เขียน backend เดียวกัน (DataStore คนละตัว, backend คนละ instance)"""
+import pytest
+
+import scoring
+import storage
+from bench.fake_sheets import FakeSpreadsheet
+
+TABLES = {
+    'Logs': [storage.LOG_COLS[:12]] + [['A', 'P', f"t{i}", '2026-01-01', '2026-02-01', '', '', 0, '- เริ่มใหม่ -', 0, 0, '']
+                                        for i in range(4)],
+    'Employees': [['Name'], ['A']],
+    'Projects': [['Project'], ['P']],
+}
+
+@pytest.fixture(params=['sheets', 'sqlite'])
+def connect(request, tmp_path):
+    # connect() -> backend ใหม่ที่ชี้ไปที่ข้อมูลชุดเดียวกัน (เหมือนอีก process)
+    if request.param == 'sheets':
+        sh = FakeSpreadsheet(TABLES)
+        return lambda: storage.SheetsBackend(lambda: sh)
+    path = str(tmp_path / 'jobs.db')
+    df, emps, projs, _ = storage.load_data(FakeSpreadsheet(TABLES))
+    storage.SQLiteBackend(path).save(df, emps, projs, {}, [None] * len(df))
+    return lambda: storage.SQLiteBackend(path)
+
+def open_store(connect):
+    st = storage.DataStore(connect(), prepare=scoring.calculate_status_and_score)
+    st.snapshot()
+    assert st.flush()  # เติม Row_ID ครั้งแรก
+    return st
+
+def rid(st, task):
+    logs = st.snap.logs
+    return logs.loc[logs['Sub_Task'] == task, '_rid'].iloc[0]
+
+def tasks(df): return sorted(df['Sub_Task'].astype(str))
+
+def test_delete_from_other_writer_is_not_resurrected(connect):
+    a = open_store(connect)
+    b = open_store(connect)
+    a.commit([('set', rid(a, 't0'), {'Output': 'a0'})]); assert a.flush()
+    b.commit([('drop', [rid(b, 't1')])]); assert b.flush()
+    a.commit([('set', rid(a, 't2'), {'Output': 'a2'})]); assert a.flush()
+
+    df = connect().load()[0]
+    assert tasks(df) == ['t0', 't2', 't3']
+    assert df['Row_ID'].is_unique
+    assert dict(zip(df['Sub_Task'], df['Output'])) == {'t0': 'a0', 't2': 'a2', 't3': ''}
+    assert tasks(a.snap.logs) == ['t0', 't2', 't3']
+
+def test_edits_to_other_columns_are_merged(connect):
+    a = open_store(connect)
+    b = open_store(connect)
+    b.commit([('set', rid(b, 't0'), {'Output': 'b'})]); assert b.flush()
+    a.commit([('set', rid(a, 't0'), {'Progress': 40})]); assert a.flush()
+
+    row = connect().load()[0].set_index('Sub_Task').loc['t0']
+    assert (row['Output'], float(row['Progress'])) == ('b', 40.0)
+    assert a.conflicts == {}
+
+def test_refresh_sees_write_right_after_ours(connect):
+    a = open_store(connect)
+    b = open_store(connect)
+    a.commit([('set', rid(a, 't0'), {'Output': 'a'})]); assert a.flush()
+    b.commit([('drop', [rid(b, 't3')])]); assert b.flush()
+    assert a.refresh()
+    assert tasks(a.snap.logs) == ['t0', 't1', 't2']
+    assert not b.refresh()
+
+def test_edit_wins_over_delete_and_is_reported(connect):
+    a = open_store(connect)
+    b = open_store(connect)
+    a.commit([('set', rid(a, 't1'), {'Output': 'a'})]); assert a.flush()
+    b.commit([('drop', [rid(b, 't1')])]); assert b.flush()
+
+    df = connect().load()[0]
+    assert tasks(df) == ['t0', 't1', 't2', 't3']
+    row_id = df.loc[df['Sub_Task'] == 't1', 'Row_ID'].iloc[0]
+    (c,), = b.conflicts.values()
+    assert (c['Row_ID'], c['col'], c['mine']) == (row_id, None, storage.ROW_DELETED)
+    assert c['rid'] == rid(b, 't1')
+    assert tasks(b.snap.logs) == ['t0', 't1', 't2', 't3']
+
+def test_delete_wins_over_status_recompute(connect):
+    a = open_store(connect)
+    other = connect()
+    df, emps, projs, synced = other.load()
+    df.loc[df['Sub_Task'] == 't1', ['Status', 'Score']] = ['🔥 ล่าช้า (Late)', 5]
+    other.save(df, emps, projs, synced, list(range(len(df))))
+
+    a.commit([('drop', [rid(a, 't1')])]); assert a.flush()
+    assert tasks(connect().load()[0]) == ['t0', 't2', 't3']
+    assert a.conflicts == {}
+
+def test_delete_by_other_writer_is_reported_to_editor(connect):
+    a = open_store(connect)
+    b = open_store(connect)
+    b.commit([('drop', [rid(b, 't2')])]); assert b.flush()
+    a.commit([('set', rid(a, 't2'), {'Output': 'a'})]); assert a.flush()
+
+    assert tasks(connect().load()[0]) == ['t0', 't1', 't3']
+    (c,), = a.conflicts.values()
+    assert (c['col'], c['theirs']) == (None, storage.ROW_DELETED)
+
+def test_conflict_resolves_after_reload(connect):
+    a = open_store(connect)
+    b = open_store(connect)
+    b.commit([('set', rid(b, 't0'), {'Output': 'b'})]); assert b.flush()
+    a.commit([('set', rid(a, 't0'), {'Output': 'a'})]); assert a.flush()
+    b.commit([('set', rid(b, 't3'), {'Output': 'b3'})]); assert b.flush()
+    assert a.refresh()  # โหลดใหม่ -> _rid ของทุกแถวเปลี่ยน
+
+    (c,), = a.conflicts.values()
+    assert c['rid'] == rid(a, 't0')
+    ops = [('set', c['rid'], {c['col']: c['mine']}, {c['col']: c['theirs']})]
+    a.commit(storage.prefer_mine(ops, [c])); assert a.flush()
+    assert connect().load()[0].set_index('Sub_Task').loc['t0', 'Output'] == 'a'
+
+def test_edit_lost_to_delete_is_listed_until_dismissed(connect):
+    a = open_store(connect)
+    b = open_store(connect)
+    b.commit([('drop', [rid(b, 't2')])]); assert b.flush()
+    a.commit([('set', rid(a, 't2'), {'Output': 'a'})]); assert a.flush()
+    b.commit([('set', rid(b, 't0'), {'Output': 'b'})]); assert b.flush()
+    assert a.refresh()
+
+    (row_id,), = [a.conflicts]
+    assert a.lost_edits() == {row_id: 't2 (A)'}
+    a.resolve(row_id)
+    assert a.conflicts == {} and a.lost_edits() == {}
@@ -0,0 +1,32 @@
+"""MirroredBackend: ฐานข้อมูล local ว่าง -> ตั้งต้นจากข้อมูลใน mirror"""
+import storage
+
+TABLES = {
+    'Logs': [storage.LOG_COLS[:12], ['A', 'P', 't0', '2026-01-01', '2026-02-01', '', '', 0, '- เริ่มใหม่ -', 0, 0, '']],
+    'Employees': [['Name'], ['A']],
+    'Projects': [['Project'], ['P']],
+    storage.LOGBOOK: [storage.LOGBOOK_COLS, ['A', 'P', 't0', '2026-01-02 09:00', 'เริ่มงาน']],
+    f"{storage.ARCHIVE_PREFIX}2024": [storage.LOG_COLS[:12],
+                                      ['A', 'P', 'old', '2024-01-01', '2024-02-01', '', '', 0, '- เริ่มใหม่ -', 100, 100, '']],
+    storage.ARCHIVE_SUMMARY: [storage.ARCHIVE_SUMMARY_COLS, [2024, 'A', 1, 100.0, 1, 0]],
+}
+
+def bootstrap(tmp_path, tables=TABLES):
+    mirror = storage.MemoryBackend(tables)
+    primary = storage.SQLiteBackend(str(tmp_path / 'jobs.db'))
+    backend = storage.MirroredBackend(primary, mirror)
+    df = backend.load()[0]
+    return backend, primary, mirror, df
+
+def test_bootstrap_copies_logbook(tmp_path):
+    backend, primary, mirror, df = bootstrap(tmp_path)
+    assert df['Sub_Task'].tolist() == ['t0']
+    assert primary.log_history('A', 'P', 't0') == [('2026-01-02 09:00', 'เริ่มงาน')]
+    backend.close()
+    assert mirror.logbook_rows() == [TABLES[storage.LOGBOOK][1]]  # ไม่ถูกส่งกลับไปต่อท้ายซ้ำ
+
+def test_bootstrap_copies_archive(tmp_path):
+    backend, primary, mirror, _ = bootstrap(tmp_path)
+    assert primary.load_archive(2024)['Sub_Task'].tolist() == ['old']
+    assert primary.archive_summary().equals(mirror.archive_summary())
+    backend.close()
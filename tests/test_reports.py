@@ -0,0 +1,61 @@
+"""ตารางผลงาน: อันดับร่วมต้องเหมือนวิธีเดิม (groupby + iterrows)"""
+import pandas as pd
+import pytest
+
+import reports
+
+LATE, DONE, ACTIVE, NOT_STARTED = "🔥 ล่าช้า (Late)", "✅ เสร็จสิ้น", "⏳ กำลังดำเนินการ", "🔜 ยังไม่ถึงกำหนดเริ่ม"
+
+def old_board(df, year):
+    # tab4 เดิม: คะแนนเฉลี่ย / จำนวนงาน / ล่าช้า แล้วไล่อันดับร่วมทีละแถว
+    dfy = df[pd.to_datetime(df['End_Date'], errors='coerce').dt.year == year]
+    t = dfy.groupby('Employee').agg(Total=('Sub_Task', 'count'), Avg=('Score', 'mean'),
+                                    Late=('Status', lambda x: x.str.contains('ล่าช้า').sum())).reset_index()
+    t['Avg'] = t['Avg'].fillna(0)
+    t['OnTime%'] = ((t['Total'] - t['Late']) / t['Total']) * 100
+    t = t.sort_values(by=['Avg', 'Total', 'OnTime%'], ascending=[False, False, False]).reset_index(drop=True)
+    last, rank, ranks = None, 0, []
+    for i, row in t.iterrows():
+        stats = (row['Avg'], row['Total'], row['OnTime%'])
+        if stats != last: rank = i + 1
+        last = stats
+        ranks.append(rank)
+    t['Rank'] = ranks
+    return t
+
+def tasks(spec):
+    # spec = {พนักงาน: [(คะแนน, สถานะ), ...]}
+    rows = [(emp, f"{emp}{i}", score, status) for emp, items in spec.items() for i, (score, status) in enumerate(items)]
+    df = pd.DataFrame(rows, columns=['Employee', 'Sub_Task', 'Score', 'Status'])
+    df['End_Date'] = pd.Timestamp('2025-06-30')
+    df['_rid'] = range(len(df))
+    return df
+
+CASES = {
+    'tie_then_gap': ({'A': [(100, DONE)], 'B': [(100, DONE)], 'C': [(50, LATE)]}, {'A': 1, 'B': 1, 'C': 3}),
+    'same_avg_more_tasks': ({'A': [(100, DONE)], 'B': [(100, DONE), (100, ACTIVE)], 'C': [(100, DONE)]},
+                            {'B': 1, 'A': 2, 'C': 2}),
+    'same_avg_and_total_ontime': ({'A': [(50, LATE), (50, ACTIVE)], 'B': [(0, ACTIVE), (100, DONE)], 'C': [(50, LATE), (50, LATE)]},
+                                  {'B': 1, 'A': 2, 'C': 3}),
+    'three_way_tie': ({'A': [(80, LATE)], 'B': [(80, LATE)], 'C': [(80, LATE)], 'D': [(10, LATE)]},
+                      {'A': 1, 'B': 1, 'C': 1, 'D': 4}),
+    'not_started_only': ({'A': [(None, NOT_STARTED)], 'B': [(0, ACTIVE)], 'C': [(100, DONE), (None, NOT_STARTED)]},
+                         {'C': 1, 'B': 2, 'A': 2}),
+}
+
+@pytest.mark.parametrize('spec, expected', CASES.values(), ids=CASES.keys())
+def test_rank_matches_old_joint_rank(spec, expected):
+    df = tasks(spec)
+    new = reports.leaderboard(df, 2025).set_index('Employee')
+    old = old_board(df, 2025).set_index('Employee')
+    assert new['Rank'].to_dict() == old['Rank'].to_dict() == expected
+    for col in ['Total', 'Avg', 'Late', 'OnTime%']:
+        pd.testing.assert_series_equal(new[col].sort_index().astype(float), old[col].sort_index().astype(float), check_names=False)
+
+@pytest.mark.parametrize('spec, expected', CASES.values(), ids=CASES.keys())
+def test_incremental_board_matches_full(spec, expected):
+    df = tasks(spec)
+    lb = reports.Leaderboard()
+    lb.sync(df.iloc[:1])
+    lb.sync(df)
+    assert lb.board(2025).set_index('Employee')['Rank'].to_dict() == expected
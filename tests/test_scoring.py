@@ -0,0 +1,68 @@
+"""calculate_status_and_score แบบทั้งคอลัมน์ต้องให้ผลเหมือนกฎเดิมที่คำนวณทีละแถว"""
+import itertools
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import scoring
+
+def old_rules(row, today):
+    # get_details เดิม (df.apply ทีละแถว) คงไว้เป็นค่าอ้างอิง
+    try:
+        s = row['Start_Date']
+        e = row['End_Date']
+        if isinstance(s, str) and s: s = datetime.strptime(s, '%Y-%m-%d').date()
+        if isinstance(e, str) and e: e = datetime.strptime(e, '%Y-%m-%d').date()
+        if not isinstance(s, date) or not isinstance(e, date): return "❓ วันที่ระบุไม่ครบ", 0
+        if row['Progress'] == 100: return "✅ เสร็จสิ้น", 100
+        elif today < s: return "🔜 ยังไม่ถึงกำหนดเริ่ม", None
+        elif today > e: return "🔥 ล่าช้า (Late)", row['Progress']
+        else: return "⏳ กำลังดำเนินการ", 100
+    except Exception: return "Error", 0
+
+TODAY = date.today()
+PAST, FUTURE = TODAY - timedelta(days=30), TODAY + timedelta(days=30)
+DATES = ['', None, pd.NaT, 'abc', '2025-02-30', '01/02/2025',
+         PAST.isoformat(), TODAY.isoformat(), FUTURE.isoformat(), PAST, FUTURE]
+CASES = list(itertools.product(DATES, DATES, [0, 50, 100]))
+
+def frame(cases):
+    return pd.DataFrame({'Start_Date': pd.Series([c[0] for c in cases], dtype=object),
+                         'End_Date': pd.Series([c[1] for c in cases], dtype=object),
+                         'Progress': [c[2] for c in cases]})
+
+def score(v): return np.nan if v is None else float(v)
+
+def test_matches_row_wise_rules():
+    df = scoring.calculate_status_and_score(frame(CASES))
+    for i, case in enumerate(CASES):
+        status, expected = old_rules(df.iloc[i], TODAY)
+        assert (df['Status'].iloc[i], score(df['Score'].iloc[i])) == pytest.approx((status, score(expected)), nan_ok=True), case
+
+@pytest.mark.parametrize('start, end, progress, status', [
+    ('', FUTURE.isoformat(), 50, scoring.STATUS_NO_DATE),
+    (None, None, 100, scoring.STATUS_NO_DATE),
+    ('2025-13-01', FUTURE.isoformat(), 50, scoring.STATUS_ERROR),
+    (PAST.isoformat(), 'abc', 100, scoring.STATUS_ERROR),
+    (PAST.isoformat(), FUTURE.isoformat(), 100, scoring.STATUS_DONE),
+    (FUTURE.isoformat(), FUTURE.isoformat(), 0, scoring.STATUS_NOT_STARTED),
+    (PAST.isoformat(), PAST.isoformat(), 50, scoring.STATUS_LATE),
+    (PAST.isoformat(), TODAY.isoformat(), 0, scoring.STATUS_ACTIVE),
+])
+def test_status_buckets(start, end, progress, status):
+    assert scoring.calculate_status_and_score(frame([(start, end, progress)]))['Status'].iloc[0] == status
+
+def test_loaded_datetime_columns_match_old_loader():
+    # โหลดเดิมแปลงด้วย pd.to_datetime(..., errors='coerce').dt.date (ช่องว่าง / ผิดรูปแบบ -> NaT)
+    # ตอนนี้ coerce_logs ให้คอลัมน์ datetime64 แทน ผลต้องเหมือนกัน
+    raw = [c for c in CASES if all(isinstance(d, str) for d in c[:2])]
+    typed = frame(raw)
+    for col in ('Start_Date', 'End_Date'): typed[col] = pd.to_datetime(typed[col], format='%Y-%m-%d', errors='coerce')
+    old = typed.copy()
+    for col in ('Start_Date', 'End_Date'): old[col] = old[col].dt.date
+    typed = scoring.calculate_status_and_score(typed)
+    for i in range(len(raw)):
+        status, expected = old_rules(old.iloc[i], TODAY)
+        assert (typed['Status'].iloc[i], score(typed['Score'].iloc[i])) == pytest.approx((status, score(expected)), nan_ok=True), raw[i]
@@ -0,0 +1,49 @@
+"""การเขียนแบบ delta / เขียนทั้งชีตลง Sheets (ใช้ชีตจำลองของ bench ที่จำกัดขนาด grid แบบ Sheets จริง)"""
+import pytest
+
+import reports
+import storage
+from bench.fake_sheets import FakeSpreadsheet
+
+HEADER = ['Name']
+
+def sheet(rows):
+    sh = FakeSpreadsheet({'Employees': [HEADER] + rows})
+    return sh, sh.ws['Employees']
+
+def apply(sh, ws, base, rows, pos):
+    reqs = storage._delta_requests(ws.id, HEADER, base and storage._row_keys(base), rows, pos)
+    if reqs: sh.batch_update({'requests': reqs})
+    return reqs
+
+def test_rewrite_grows_past_grid():
+    sh, ws = sheet([['a']])
+    rows = [[f"n{i}"] for i in range(50)]
+    apply(sh, ws, None, rows, [None] * 50)  # ไม่รู้ค่าบนชีต (mirror เพิ่งเริ่ม) -> เขียนใหม่ทั้งชีต
+    assert ws.rows == [HEADER] + rows
+
+def test_reorder_rewrites_whole_sheet():
+    sh, ws = sheet([['a'], ['b']])
+    rows = [['b'], ['a'], ['c'], ['d']]
+    apply(sh, ws, [['a'], ['b']], rows, [1, 0, None, None])
+    assert ws.rows == [HEADER] + rows
+
+def test_contiguous_deletes_are_one_request():
+    base = [[x] for x in 'abcdefg']
+    sh, ws = sheet(base)
+    keep = [0, 4, 6]
+    reqs = apply(sh, ws, base, [base[p] for p in keep], keep)
+    assert [r['deleteDimension']['range']['startIndex'] for r in reqs] == [6, 2]
+    assert ws.rows == [HEADER, ['a'], ['e'], ['g']]
+
+@pytest.mark.parametrize('archived', [False, True])
+def test_reload_reads_archive_summary_in_same_batch(archived):
+    tables = {'Logs': [storage.LOG_COLS], 'Employees': [['Name'], ['A']], 'Projects': [['Project'], ['P']]}
+    if archived: tables[storage.ARCHIVE_SUMMARY] = [storage.ARCHIVE_SUMMARY_COLS, [2020, 'A', 3, 250.0, 3, 1]]
+    sh = FakeSpreadsheet(tables)
+    st = storage.DataStore(storage.SheetsBackend(lambda: sh), summarize=reports.year_sums)
+    st.snapshot()
+    sh.reset_counters()
+    st.reload()
+    assert dict(sh.calls) == {'get_lastUpdateTime': 1, 'values_batch_get': 1}
+    assert st.archive_state()[0]['Total'].tolist() == ([3] if archived else [])
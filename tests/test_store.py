@@ -0,0 +1,33 @@
+"""DataStore: โหลด / เขียนเมื่อ backend มีปัญหา"""
+import pytest
+
+import storage
+
+class FlakyBackend(storage.MemoryBackend):
+    def __init__(self, failures):
+        super().__init__({'Employees': [['Name'], ['A']]})
+        self.failures = failures
+
+    def load(self):
+        if self.failures:
+            self.failures -= 1
+            self.loads += 1
+            raise RuntimeError("429 quota")
+        return super().load()
+
+def test_failed_load_backs_off():
+    backend = FlakyBackend(failures=1)
+    st = storage.DataStore(backend)
+    for _ in range(5): st.snapshot()
+    assert backend.loads == 1
+    assert str(st.load_error) == "429 quota" and not st.loaded
+
+    st.retry_load_at = 0  # หมด backoff
+    assert st.snapshot().employees == ('A',)
+    assert backend.loads == 2
+    assert st.load_error is None and st.load_failures == 0
+
+def test_commit_before_load_raises():
+    st = storage.DataStore(FlakyBackend(failures=1))
+    st.snapshot()
+    with pytest.raises(RuntimeError): st.commit([('list_add', 'employees', 'B')])